@@ -0,0 +1,25 @@
+"""Move old orders out of the hot tables.
+
+Run from Assignment5/, e.g. nightly from cron:
+
+    python -m api.archive               # orders older than ARCHIVE_AFTER_DAYS
+    python -m api.archive --days 90     # orders older than 90 days
+"""
+import argparse
+
+from .controllers import archive
+from .dependencies.database import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=None, help="archive orders placed more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=None, help="orders moved per transaction")
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        moved = archive.archive(db, archive.cutoff(args.days), args.batch_size)
+    print(f"Archived {moved} orders")
+
+
+if __name__ == "__main__":
+    main()
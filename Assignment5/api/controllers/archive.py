@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import select, insert, delete, func, distinct
+from sqlalchemy.orm import Session
+from ..models import models
+from ..dependencies.config import conf
+from . import reports
+
+
+def cutoff(days=None):
+    return datetime.now() - timedelta(days=conf.archive_after_days if days is None else days)
+
+
+def archive(db: Session, before, batch_size=None):
+    """Move orders placed before `before` into the archive tables, batch_size orders per transaction.
+
+    Each batch adds its hourly totals to the rollup tables, copies the orders and their details,
+    and deletes them from the hot tables, so a crash between batches loses nothing.
+    """
+    batch_size = batch_size or conf.archive_batch_size
+    moved = 0
+    while True:
+        ids = list(db.scalars(
+            select(models.Order.id).where(models.Order.order_date < before).order_by(models.Order.id).limit(batch_size)
+        ))
+        if not ids:
+            return moved
+        roll_up(db, ids)
+        db.execute(insert(models.ArchivedOrder).from_select(
+            ["id", "customer_name", "order_date", "description"],
+            select(models.Order.id, models.Order.customer_name, models.Order.order_date, models.Order.description)
+            .where(models.Order.id.in_(ids)),
+        ))
+        db.execute(insert(models.ArchivedOrderDetail).from_select(
+            ["id", "order_id", "sandwich_id", "amount"],
+            select(models.OrderDetail.id, models.OrderDetail.order_id, models.OrderDetail.sandwich_id, models.OrderDetail.amount)
+            .where(models.OrderDetail.order_id.in_(ids)),
+        ))
+        db.execute(delete(models.OrderDetail).where(models.OrderDetail.order_id.in_(ids)))
+        db.execute(delete(models.Order).where(models.Order.id.in_(ids)))
+        db.commit()
+        moved += len(ids)
+
+
+def roll_up(db: Session, ids):
+    """Add the orders' hourly totals, overall and per sandwich, to the rollup tables."""
+    hour = reports.bucket(db, "hour").label("hour")
+    orders = (
+        reports.from_orders(hour, func.count(distinct(models.Order.id)).label("orders"), *reports.totals())
+        .where(models.Order.id.in_(ids))
+        .group_by(hour)
+    )
+    for row in db.execute(orders).all():
+        add_to(db, models.OrderRollup, {"hour": datetime.fromisoformat(row.hour)}, row)
+    sandwiches = (
+        reports.from_details(hour, models.OrderDetail.sandwich_id, func.count(distinct(models.Order.id)).label("orders"), *reports.totals())
+        .where(models.Order.id.in_(ids))
+        .group_by(hour, models.OrderDetail.sandwich_id)
+    )
+    for row in db.execute(sandwiches).all():
+        add_to(db, models.SandwichRollup, {"hour": datetime.fromisoformat(row.hour), "sandwich_id": row.sandwich_id}, row)
+    db.flush()
+
+
+def add_to(db: Session, model, key, row):
+    rollup = db.get(model, key)
+    if rollup is None:
+        rollup = model(**key, orders=0, units=0, revenue=Decimal(0))
+        db.add(rollup)
+    rollup.orders += row.orders
+    rollup.units += row.units
+    rollup.revenue += Decimal(str(row.revenue))
@@ -0,0 +1,196 @@
+from sqlalchemy import insert, update as update_stmt, delete as delete_stmt, select, tuple_, UniqueConstraint
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from ..dependencies.config import conf
+from ..models import schemas
+
+
+class Results:
+    def __init__(self):
+        self.items = []
+
+    def ok(self, index, row_id):
+        self.items.append(schemas.BulkItemResult(index=index, id=row_id))
+
+    def fail(self, index, error):
+        self.items.append(schemas.BulkItemResult(index=index, error=error))
+
+    def sorted(self):
+        items = sorted(self.items, key=lambda item: item.index)
+        failed = sum(item.error is not None for item in items)
+        return schemas.BulkResult(succeeded=len(items) - failed, failed=failed, results=items)
+
+
+def chunks(rows, size=None):
+    size = size or conf.bulk_batch_size
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def validate(schema, items, result):
+    """Validate every item on its own so one bad row is reported instead of rejecting the batch."""
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            result.fail(index, e.errors(include_url=False, include_context=False, include_input=False))
+    return valid
+
+
+def write(db: Session, statement, rows, result, returning=False):
+    """Run one chunk as a single statement; on an integrity error retry row by row to find the culprits.
+
+    rows is a list of (index, params) pairs.
+    """
+    try:
+        with db.begin_nested():
+            res = db.execute(statement, [params for _, params in rows])
+            ids = res.scalars().all() if returning else [params.get("id") for _, params in rows]
+        for (index, _), row_id in zip(rows, ids):
+            result.ok(index, row_id)
+        return
+    except IntegrityError:
+        pass
+
+    for index, params in rows:
+        try:
+            with db.begin_nested():
+                res = db.execute(statement, [params])
+                row_id = res.scalars().first() if returning else params.get("id")
+            result.ok(index, row_id)
+        except IntegrityError as e:
+            result.fail(index, str(e.orig))
+
+
+def natural_key(model):
+    """Columns of the model's first unique constraint, or () if it has none."""
+    for constraint in model.__table__.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            return tuple(column.name for column in constraint.columns)
+    return ()
+
+
+def insert_keyed(db: Session, model, key, rows, result):
+    """Without RETURNING, insert a chunk in one statement and read its ids back by its natural key."""
+    try:
+        # One savepoint per chunk: an executemany can fail after some of its rows went in
+        with db.begin_nested():
+            db.execute(insert(model), [params for _, params in rows])
+    except IntegrityError:
+        insert_each(db, insert(model), rows, result)
+        return
+    columns = [model.__table__.c[name] for name in key]
+    values = [tuple(params[name] for name in key) for _, params in rows]
+    ids = {tuple(row[1:]): row[0] for row in db.execute(select(model.id, *columns).where(tuple_(*columns).in_(values)))}
+    for (index, _), value in zip(rows, values):
+        result.ok(index, ids.get(value))
+
+
+def insert_each(db: Session, statement, rows, result):
+    """Insert one row per statement, so each new id comes back without RETURNING.
+
+    No savepoints: on the dialects without RETURNING (MySQL) a failed INSERT only undoes
+    itself, and the transaction goes on.
+    """
+    for index, params in rows:
+        try:
+            row_id = db.connection().execute(statement, params).inserted_primary_key[0]
+        except IntegrityError as e:
+            result.fail(index, str(e.orig))
+        else:
+            result.ok(index, row_id)
+
+
+def create(db: Session, model, schema, items):
+    """Insert items chunk by chunk, reporting each one's new id or error.
+
+    With executemany RETURNING that is one statement per chunk. Without it (MySQL), models
+    with a unique key take an INSERT and a SELECT per chunk, others one INSERT per row.
+    """
+    result = Results()
+    rows = [(index, item.model_dump()) for index, item in validate(schema, items, result)]
+
+    statement = insert(model)
+    if db.get_bind().dialect.insert_executemany_returning:
+        statement = statement.returning(model.id, sort_by_parameter_order=True)
+        for chunk in chunks(rows):
+            write(db, statement, chunk, result, returning=True)
+    else:
+        key = natural_key(model)
+        for chunk in chunks(rows):
+            if key:
+                insert_keyed(db, model, key, chunk, result)
+            else:
+                insert_each(db, statement, chunk, result)
+    db.commit()
+    return result.sorted()
+
+
+def update(db: Session, model, schema, items):
+    result = Results()
+    rows = []
+    for index, item in validate(schemas.BulkUpdateItem, items, result):
+        try:
+            changes = schema.model_validate(item.model_extra).model_dump(exclude_unset=True)
+        except ValidationError as e:
+            result.fail(index, e.errors(include_url=False, include_context=False, include_input=False))
+            continue
+        rows.append((index, {"id": item.id, **changes}))
+
+    existing = found_ids(db, model, [params["id"] for _, params in rows])
+    for index, params in rows:
+        if params["id"] not in existing:
+            result.fail(index, "Not found")
+    rows = [(index, params) for index, params in rows if params["id"] in existing]
+
+    # ORM bulk UPDATE by primary key: one executemany per chunk, like bulk_update_mappings
+    for chunk in chunks(rows):
+        write(db, update_stmt(model), chunk, result)
+    if "version" in model.__table__.columns:
+        # Per-row parameters can't say version + 1, so bump every updated row in one more statement per chunk
+        updated = [item.id for item in result.items if item.error is None]
+        for chunk in chunks(updated):
+            db.execute(
+                update_stmt(model).where(model.id.in_(chunk)).values(version=model.version + 1),
+                execution_options={"synchronize_session": False},
+            )
+    db.commit()
+    return result.sorted()
+
+
+def delete(db: Session, model, ids):
+    result = Results()
+    existing = found_ids(db, model, ids)
+    rows = []
+    for index, row_id in enumerate(ids):
+        if row_id in existing:
+            rows.append((index, {"id": row_id}))
+        else:
+            result.fail(index, "Not found")
+
+    for chunk in chunks(rows):
+        try:
+            with db.begin_nested():
+                db.execute(delete_stmt(model).where(model.id.in_([params["id"] for _, params in chunk])))
+            for index, params in chunk:
+                result.ok(index, params["id"])
+        except IntegrityError:
+            # Still referenced somewhere; find out which ones row by row
+            for index, params in chunk:
+                try:
+                    with db.begin_nested():
+                        db.execute(delete_stmt(model).where(model.id == params["id"]))
+                    result.ok(index, params["id"])
+                except IntegrityError as e:
+                    result.fail(index, str(e.orig))
+    db.commit()
+    return result.sorted()
+
+
+def found_ids(db: Session, model, ids):
+    existing = set()
+    for chunk in chunks(list(set(ids))):
+        existing.update(db.scalars(select(model.id).where(model.id.in_(chunk))))
+    return existing
@@ -0,0 +1,118 @@
+import hashlib
+import random
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, Response
+from ..models import models
+from ..dependencies.config import conf
+from ..dependencies.http_cache import adapter
+
+# Share of claims that also sweep expired keys, so the table doesn't grow without bound
+PURGE_PROBABILITY = 0.01
+
+
+def now():
+    # Naive UTC, so expiry doesn't depend on the database server's time zone
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def claim(db: Session, scope, key, request_hash):
+    """Insert the key and return (None, its created_at), or (the row already holding it, None).
+
+    The primary key makes this safe under races; created_at identifies this claim from then on.
+    """
+    for _ in range(2):
+        claimed_at = now()
+        db.add(models.IdempotencyKey(scope=scope, key=key, request_hash=request_hash, created_at=claimed_at))
+        try:
+            db.commit()
+            return None, claimed_at
+        except IntegrityError:
+            db.rollback()
+        existing = db.get(models.IdempotencyKey, (scope, key), populate_existing=True)
+        if existing is None:
+            # Released by a failed first attempt between our insert and this read
+            continue
+        age = now() - existing.created_at
+        # Still without a response after the lease: the request holding it died before finishing
+        abandoned = existing.status_code is None and age > timedelta(seconds=conf.idempotency_lease)
+        if age <= timedelta(seconds=conf.idempotency_ttl) and not abandoned:
+            return existing, None
+        # Expired or abandoned: whoever deletes it first gets to claim it again
+        stale = db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.scope == scope,
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.created_at == existing.created_at,
+        )
+        if abandoned:
+            stale = stale.filter(models.IdempotencyKey.status_code.is_(None))
+        stale.delete(synchronize_session=False)
+        db.commit()
+    raise HTTPException(status_code=409, detail="Idempotency-Key is being reused concurrently")
+
+
+def owned(db: Session, scope, key, claimed_at):
+    """The key's row while it is still our claim: not taken over by a retry, and without a response."""
+    return db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.scope == scope,
+        models.IdempotencyKey.key == key,
+        models.IdempotencyKey.created_at == claimed_at,
+        models.IdempotencyKey.status_code.is_(None),
+    )
+
+
+def release(db: Session, scope, key, claimed_at):
+    db.rollback()
+    owned(db, scope, key, claimed_at).delete(synchronize_session=False)
+    db.commit()
+
+
+def purge(db: Session):
+    db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.created_at < now() - timedelta(seconds=conf.idempotency_ttl)
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def replay(existing, request_hash):
+    if existing.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    if existing.status_code is None:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+    return Response(
+        content=existing.response_body,
+        status_code=existing.status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def create_once(db: Session, scope, key, payload, create, schema):
+    """Run create(db, payload) at most once per key; repeats get the stored response back.
+
+    The new rows and the stored response commit in one transaction, so a request that dies
+    midway leaves nothing behind for the retry that takes its key over after the lease, and
+    a request that lost its key that way rolls back instead of creating a second row.
+    If create fails the key is released, so the client can retry once it has fixed the request.
+    """
+    request_hash = hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+    existing, claimed_at = claim(db, scope, key, request_hash)
+    if existing is not None:
+        return replay(existing, request_hash)
+
+    try:
+        created = create(db, payload, commit=False)
+        body = adapter(schema).dump_json(adapter(schema).validate_python(created, from_attributes=True))
+        stored = owned(db, scope, key, claimed_at).update(
+            {"status_code": 200, "response_body": body.decode()}, synchronize_session=False,
+        )
+        if stored == 0:
+            raise HTTPException(status_code=409, detail="A retry with this Idempotency-Key took it over")
+        db.commit()
+    except BaseException:
+        release(db, scope, key, claimed_at)
+        raise
+    if random.random() < PURGE_PROBABILITY:
+        purge(db)
+    return Response(content=body, media_type="application/json")
@@ -1,15 +1,29 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status, Response
-from ..models import models
+from ..models import models, schemas
+from ..dependencies.listing import Listing, mapped
+from . import bulk
+from .references import check_references
 
+# Order details serialize their sandwich; join it into the same SELECT
+LOAD_OPTIONS = (
+    joinedload(models.OrderDetail.sandwich),
+)
+LISTING = Listing(
+    models.OrderDetail, schemas.OrderDetail,
+    filters=("order_id", "sandwich_id", "amount"),
+    sortable=("amount",),
+)
 
-def create(db: Session, order_detail):
+
+def create(db: Session, order_detail, commit=True):
     # Validate FKs exist
-    if db.query(models.Order).filter(models.Order.id == order_detail.order_id).first() is None:
-        raise HTTPException(status_code=404, detail="Order not found")
-    if db.query(models.Sandwich).filter(models.Sandwich.id == order_detail.sandwich_id).first() is None:
-        raise HTTPException(status_code=404, detail="Sandwich not found")
+    check_references(db, [
+        (models.Order, order_detail.order_id, "Order not found"),
+        (models.Sandwich, order_detail.sandwich_id, "Sandwich not found"),
+    ])
 
     db_od = models.OrderDetail(
         order_id=order_detail.order_id,
@@ -18,45 +32,98 @@ def create(db: Session, order_detail):
     )
     db.add(db_od)
     try:
-        db.commit()
+        db.flush()
+        order_detail_id = db_od.id
+        if commit:
+            db.commit()
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Invalid order detail data")
-    db.refresh(db_od)
-    return db_od
+    return read_one(db, order_detail_id)
+
+
+def read_all(db: Session, params):
+    return LISTING.fetch(db, params, LOAD_OPTIONS)
+
+
+def read_all_plain(db: Session, params):
+    """read_all as plain dicts, shaped and ordered exactly as schemas.OrderDetail serializes."""
+    page = LISTING.fetch(db, params, plain=True)
+    details = {detail["id"]: detail for detail in plain_rows(db, models.OrderDetail.id.in_([row.id for row in page]))} if page else {}
+    return mapped(page, lambda row: details[row.id])
+
+
+def plain_rows(db: Session, *criteria):
+    """Order details joined to their sandwich as row tuples, turned into schemas.OrderDetail-shaped dicts."""
+    rows = db.execute(
+        select(
+            models.OrderDetail.amount, models.OrderDetail.id, models.OrderDetail.order_id,
+            models.Sandwich.sandwich_name, models.Sandwich.price, models.Sandwich.id,
+        )
+        .outerjoin(models.Sandwich, models.Sandwich.id == models.OrderDetail.sandwich_id)
+        .where(*criteria)
+        .order_by(models.OrderDetail.id)
+    )
+    return [
+        {
+            "amount": amount,
+            "id": detail_id,
+            "order_id": order_id,
+            "sandwich": None if sandwich_id is None else {
+                "sandwich_name": sandwich_name, "price": float(price), "id": sandwich_id,
+            },
+        }
+        for amount, detail_id, order_id, sandwich_name, price, sandwich_id in rows
+    ]
 
 
-def read_all(db: Session):
-    return db.query(models.OrderDetail).all()
+def stream_all(db: Session, params):
+    return LISTING.stream(db, params, LOAD_OPTIONS)
 
 
 def read_one(db: Session, order_detail_id):
-    return db.query(models.OrderDetail).filter(models.OrderDetail.id == order_detail_id).first()
+    return db.query(models.OrderDetail).options(*LOAD_OPTIONS).filter(models.OrderDetail.id == order_detail_id).first()
 
 
 def update(db: Session, order_detail_id, order_detail):
     q = db.query(models.OrderDetail).filter(models.OrderDetail.id == order_detail_id)
-    if q.first() is None:
-        return None
     update_data = order_detail.model_dump(exclude_unset=True)
+    if not update_data:
+        return read_one(db, order_detail_id)
     # Validate FKs on change
-    if "order_id" in update_data:
-        if db.query(models.Order).filter(models.Order.id == update_data["order_id"]).first() is None:
-            raise HTTPException(status_code=404, detail="Order not found")
-    if "sandwich_id" in update_data:
-        if db.query(models.Sandwich).filter(models.Sandwich.id == update_data["sandwich_id"]).first() is None:
-            raise HTTPException(status_code=404, detail="Sandwich not found")
-    q.update(update_data, synchronize_session=False)
+    check_references(db, [
+        (model, update_data[field], detail)
+        for field, model, detail in (
+            ("order_id", models.Order, "Order not found"),
+            ("sandwich_id", models.Sandwich, "Sandwich not found"),
+        )
+        if field in update_data
+    ])
     try:
+        if q.update(update_data, synchronize_session=False) == 0:
+            return None
         db.commit()
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Invalid order detail data")
-    return q.first()
+    return read_one(db, order_detail_id)
 
 
 def delete(db: Session, order_detail_id):
     q = db.query(models.OrderDetail).filter(models.OrderDetail.id == order_detail_id)
-    q.delete(synchronize_session=False)
+    if q.delete(synchronize_session=False) == 0:
+        return None
     db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+def bulk_create(db: Session, items):
+    return bulk.create(db, models.OrderDetail, schemas.OrderDetailCreate, items)
+
+
+def bulk_update(db: Session, items):
+    return bulk.update(db, models.OrderDetail, schemas.OrderDetailUpdate, items)
+
+
+def bulk_delete(db: Session, ids):
+    return bulk.delete(db, models.OrderDetail, ids)
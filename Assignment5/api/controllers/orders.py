@@ -1,37 +1,228 @@
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from uuid import uuid4
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session, selectinload, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from fastapi import HTTPException, status, Response, Depends
 from ..models import models, schemas
+from ..dependencies.listing import Listing, mapped
+from ..dependencies.cache import recipe_cache
+from . import bulk, resources, order_details
 
+# Orders serialize their details and each detail's sandwich, so load both up front
+LOAD_OPTIONS = (
+    selectinload(models.Order.order_details).joinedload(models.OrderDetail.sandwich),
+)
+LISTING = Listing(
+    models.Order, schemas.Order,
+    filters=("customer_name", "order_date"),
+    sortable=("order_date",),
+)
+ARCHIVE_LOAD_OPTIONS = (
+    selectinload(models.ArchivedOrder.order_details).joinedload(models.ArchivedOrderDetail.sandwich),
+)
+ARCHIVE_LISTING = Listing(
+    models.ArchivedOrder, schemas.Order,
+    filters=("customer_name", "order_date"),
+    sortable=("order_date",),
+)
 
-def create(db: Session, order):
+
+def create(db: Session, order, commit=True):
+    """commit=False only flushes, so a caller can commit the order together with its own writes."""
+    if getattr(order, "details", None):
+        return create_with_details(db, order, commit)
     db_order = models.Order(
         customer_name=order.customer_name,
         description=order.description
     )
     db.add(db_order)
-    db.commit()
+    if commit:
+        db.commit()
+    else:
+        db.flush()
     db.refresh(db_order)
+    # A new order has no details yet; mark the collection loaded so serializing it needs no query
+    set_committed_value(db_order, "order_details", [])
     return db_order
 
 
-def read_all(db: Session):
-    return db.query(models.Order).all()
+def create_with_details(db: Session, order, commit=True):
+    """Create an order and its lines with one sandwich lookup, one flush and one commit."""
+    if missing_sandwiches(db, order.details):
+        raise HTTPException(status_code=404, detail="Sandwich not found")
+    db_order = models.Order(customer_name=order.customer_name, description=order.description)
+    db.add(db_order)
+    db.flush()
+    order_id = db_order.id
+    # One executemany for every line; ORM inserts would go one row at a time to fetch each id
+    db.execute(insert(models.OrderDetail), [{"order_id": order_id, **line.model_dump()} for line in order.details])
+    if commit:
+        db.commit()
+    # Two SELECTs load the order, every detail and their sandwiches, however many lines there are
+    return read_one(db, order_id)
+
+
+def missing_sandwiches(db: Session, lines):
+    """Sandwich ids referenced by lines that don't exist, found with a single IN lookup."""
+    wanted = {line.sandwich_id for line in lines}
+    if not wanted:
+        return set()
+    return wanted - set(db.scalars(select(models.Sandwich.id).where(models.Sandwich.id.in_(wanted))))
+
+
+def reserve_ids(db: Session, count):
+    """Reserve a block of order ids that no other insert will take, without creating any orders.
+
+    One executemany inserts count placeholder rows, tagged so they can be found again, and
+    deletes them in the same transaction. Ids the auto-increment counter handed to our own rows
+    can't have gone to anyone else, and the counter never hands them out again: SQLite's
+    AUTOINCREMENT, MySQL 8.0+ and MariaDB 10.2.4+ keep it across restarts. Older servers reset
+    it to MAX(id)+1 on restart, which would reuse reserved ids, so it is refused. The block may have gaps.
+    """
+    dialect = db.connection().dialect
+    if dialect.name == "mysql" and dialect.server_version_info < ((10, 2, 4) if dialect.is_mariadb else (8, 0)):
+        raise HTTPException(status_code=503, detail="Order ingestion needs MySQL 8.0 or MariaDB 10.2.4 or later")
+    tag = f"reserving {uuid4().hex}"
+    db.execute(insert(models.Order), [{"customer_name": tag}] * count)
+    reserved = sorted(db.scalars(select(models.Order.id).where(models.Order.customer_name == tag)))
+    db.query(models.Order).filter(models.Order.customer_name == tag).delete(synchronize_session=False)
+    db.commit()
+    return reserved
+
+
+def create_batch(db: Session, batch):
+    """Insert queued (id, OrderCreate) pairs and their details in one transaction.
+
+    Orders naming a missing sandwich fail on their own; the rest fall back to row by row on errors.
+    """
+    result = bulk.Results()
+    missing = missing_sandwiches(db, [line for _, order in batch for line in order.details])
+    rows = []
+    for order_id, order in batch:
+        if any(line.sandwich_id in missing for line in order.details):
+            result.fail(order_id, "Sandwich not found")
+        else:
+            rows.append((order_id, {"id": order_id, **order.model_dump(exclude={"details"})}))
+    for chunk in bulk.chunks(rows):
+        bulk.write(db, insert(models.Order), chunk, result)
+
+    written = {item.index for item in result.items if item.error is None}
+    details = [
+        {"order_id": order_id, **line.model_dump()}
+        for order_id, order in batch if order_id in written
+        for line in order.details
+    ]
+    for chunk in bulk.chunks(details):
+        db.execute(insert(models.OrderDetail), chunk)
+    db.commit()
+    return result.sorted()
+
+
+def place(db: Session, order):
+    quantities = defaultdict(int)
+    for item in order.items:
+        quantities[item.sandwich_id] += item.quantity
+
+    # One query for every requested sandwich and its recipe lines
+    rows = db.execute(
+        select(models.Sandwich.id, models.Recipe.resource_id, models.Recipe.amount)
+        .outerjoin(models.Recipe, models.Recipe.sandwich_id == models.Sandwich.id)
+        .where(models.Sandwich.id.in_(quantities))
+    ).all()
+    if {row.id for row in rows} != set(quantities):
+        raise HTTPException(status_code=404, detail="Sandwich not found")
+
+    needed = defaultdict(int)
+    for sandwich_id, resource_id, amount in rows:
+        if resource_id is not None:
+            needed[resource_id] += amount * quantities[sandwich_id]
+
+    # Conditional decrements hold row locks until commit; a fixed id order avoids deadlocks
+    for resource_id in sorted(needed):
+        updated = db.query(models.Resource).filter(
+            models.Resource.id == resource_id,
+            models.Resource.amount >= needed[resource_id],
+        ).update({
+            "amount": models.Resource.amount - needed[resource_id],
+            "version": models.Resource.version + 1,
+        }, synchronize_session=False)
+        if updated != 1:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Not enough ingredients to fulfill order")
+
+    db_order = models.Order(
+        customer_name=order.customer_name,
+        description=order.description,
+        order_details=[
+            models.OrderDetail(sandwich_id=sandwich_id, amount=quantity)
+            for sandwich_id, quantity in quantities.items()
+        ],
+    )
+    db.add(db_order)
+    db.commit()
+    # Recipes embed resource amounts, which just changed
+    recipe_cache.invalidate()
+    resources.publish(db, needed)
+    return read_one(db, db_order.id)
+
+
+def read_all(db: Session, params):
+    return LISTING.fetch(db, params, LOAD_OPTIONS)
+
+
+def read_all_with_archived(db: Session, params):
+    """read_all across hot and archived orders, paged as if they were one table."""
+    return LISTING.merge(
+        params,
+        LISTING.fetch(db, params, LOAD_OPTIONS),
+        ARCHIVE_LISTING.fetch(db, params, ARCHIVE_LOAD_OPTIONS),
+    )
+
+
+def read_all_plain(db: Session, params):
+    """read_all as plain dicts, shaped and ordered exactly as schemas.Order serializes."""
+    page = LISTING.fetch(db, params, plain=True)
+    details = {row.id: [] for row in page}
+    if details:
+        for detail in order_details.plain_rows(db, models.OrderDetail.order_id.in_(details)):
+            details[detail["order_id"]].append(detail)
+    return mapped(page, lambda row: {**row._asdict(), "order_details": details[row.id]})
+
+
+def stream_all(db: Session, params):
+    return LISTING.stream(db, params, LOAD_OPTIONS)
 
 
 def read_one(db: Session, order_id):
-    return db.query(models.Order).filter(models.Order.id == order_id).first()
+    return db.query(models.Order).options(*LOAD_OPTIONS).filter(models.Order.id == order_id).first()
 
 
 def update(db: Session, order_id, order):
     db_order = db.query(models.Order).filter(models.Order.id == order_id)
     update_data = order.model_dump(exclude_unset=True)
-    db_order.update(update_data, synchronize_session=False)
+    if update_data and db_order.update(update_data, synchronize_session=False) == 0:
+        return None
     db.commit()
-    return db_order.first()
+    return read_one(db, order_id)
 
 
 def delete(db: Session, order_id):
     db_order = db.query(models.Order).filter(models.Order.id == order_id)
-    db_order.delete(synchronize_session=False)
+    if db_order.delete(synchronize_session=False) == 0:
+        return None
     db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+def bulk_create(db: Session, items):
+    # Bulk rows are orders alone; nested details are created through POST /orders/
+    return bulk.create(db, models.Order, schemas.OrderBase, items)
+
+
+def bulk_update(db: Session, items):
+    return bulk.update(db, models.Order, schemas.OrderUpdate, items)
+
+
+def bulk_delete(db: Session, ids):
+    return bulk.delete(db, models.Order, ids)
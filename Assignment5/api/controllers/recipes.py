@@ -1,15 +1,31 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status, Response, Depends
 from ..models import models, schemas
+from ..dependencies.listing import Listing, serialized
+from ..dependencies.database import is_replica
+from ..dependencies.cache import recipe_cache
+from . import bulk
+from .references import check_references
+
+# Recipes serialize their sandwich and resource; join both into the same SELECT
+LOAD_OPTIONS = (
+    joinedload(models.Recipe.sandwich),
+    joinedload(models.Recipe.resource),
+)
+LISTING = Listing(
+    models.Recipe, schemas.Recipe,
+    filters=("sandwich_id", "resource_id"),
+    sortable=("amount",),
+)
 
 
 def create(db: Session, recipe):
     # Validate FKs exist
-    if db.query(models.Sandwich).filter(models.Sandwich.id == recipe.sandwich_id).first() is None:
-        raise HTTPException(status_code=404, detail="Sandwich not found")
-    if db.query(models.Resource).filter(models.Resource.id == recipe.resource_id).first() is None:
-        raise HTTPException(status_code=404, detail="Resource not found")
+    check_references(db, [
+        (models.Sandwich, recipe.sandwich_id, "Sandwich not found"),
+        (models.Resource, recipe.resource_id, "Resource not found"),
+    ])
 
     db_recipe = models.Recipe(
         sandwich_id=recipe.sandwich_id,
@@ -18,54 +34,99 @@ def create(db: Session, recipe):
     )
     db.add(db_recipe)
     try:
+        db.flush()
+        recipe_id = db_recipe.id
         db.commit()
+        recipe_cache.invalidate()
     except IntegrityError:
         db.rollback()
         # Likely unique constraint on (sandwich_id, resource_id) or FK issue
         raise HTTPException(status_code=409, detail="Recipe for this sandwich and resource already exists")
-    db.refresh(db_recipe)
-    return db_recipe
+    return read_one(db, recipe_id)
+
 
+def read_all(db: Session, params):
+    return recipe_cache.get_or_load(("all", params.key()), lambda: serialized(
+        LISTING.fetch(db, params, LOAD_OPTIONS), LISTING.response_schema(params),
+    ), lagging=is_replica(db))
 
-def read_all(db: Session):
-    return db.query(models.Recipe).all()
+
+def stream_all(db: Session, params):
+    return LISTING.stream(db, params, LOAD_OPTIONS)
 
 
 def read_one(db: Session, recipe_id):
-    return db.query(models.Recipe).filter(models.Recipe.id == recipe_id).first()
+    def load():
+        row = db.query(models.Recipe).options(*LOAD_OPTIONS).filter(models.Recipe.id == recipe_id).first()
+        return None if row is None else schemas.Recipe.model_validate(row, from_attributes=True)
 
+    return recipe_cache.get_or_load(("one", recipe_id), load, lagging=is_replica(db))
 
-def update(db: Session, recipe_id, recipe):
-    db_recipe_q = db.query(models.Recipe).filter(models.Recipe.id == recipe_id)
-    existing = db_recipe_q.first()
-    if existing is None:
-        return None
 
+def update(db: Session, recipe_id, recipe, versions=None):
+    """Apply the changes, only if the row is still at one of versions when that is given."""
+    db_recipe_q = db.query(models.Recipe).filter(models.Recipe.id == recipe_id)
     update_data = recipe.model_dump(exclude_unset=True)
+    if not update_data:
+        db_recipe = read_one(db, recipe_id)
+        if db_recipe is not None and versions is not None and db_recipe.version not in versions:
+            raise changed_elsewhere()
+        return db_recipe
+
     # If FKs are changing, validate
-    if "sandwich_id" in update_data:
-        if db.query(models.Sandwich).filter(models.Sandwich.id == update_data["sandwich_id"]).first() is None:
-            raise HTTPException(status_code=404, detail="Sandwich not found")
-    if "resource_id" in update_data:
-        if db.query(models.Resource).filter(models.Resource.id == update_data["resource_id"]).first() is None:
-            raise HTTPException(status_code=404, detail="Resource not found")
-
-    db_recipe_q.update(update_data, synchronize_session=False)
+    check_references(db, [
+        (model, update_data[field], detail)
+        for field, model, detail in (
+            ("sandwich_id", models.Sandwich, "Sandwich not found"),
+            ("resource_id", models.Resource, "Resource not found"),
+        )
+        if field in update_data
+    ])
+
+    matching = db_recipe_q if versions is None else db_recipe_q.filter(models.Recipe.version.in_(versions))
     try:
+        if matching.update({**update_data, "version": models.Recipe.version + 1}, synchronize_session=False) == 0:
+            if versions is not None and db_recipe_q.first() is not None:
+                raise changed_elsewhere()
+            return None
         db.commit()
+        recipe_cache.invalidate()
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=409, detail="Recipe for this sandwich and resource already exists")
-    return db_recipe_q.first()
+    return read_one(db, recipe_id)
+
+
+def changed_elsewhere():
+    return HTTPException(status_code=412, detail="Recipe was changed by someone else; fetch it again")
 
 
 def delete(db: Session, recipe_id):
     # Query the database for the specific recipe to delete
     db_recipe = db.query(models.Recipe).filter(models.Recipe.id == recipe_id)
     # Delete the database record without synchronizing the session
-    db_recipe.delete(synchronize_session=False)
+    if db_recipe.delete(synchronize_session=False) == 0:
+        return None
     # Commit the changes to the database
     db.commit()
+    recipe_cache.invalidate()
     # Return a response with a status code indicating success (204 No Content)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
+
+def bulk_create(db: Session, items):
+    result = bulk.create(db, models.Recipe, schemas.RecipeCreate, items)
+    recipe_cache.invalidate()
+    return result
+
+
+def bulk_update(db: Session, items):
+    result = bulk.update(db, models.Recipe, schemas.RecipeUpdate, items)
+    recipe_cache.invalidate()
+    return result
+
+
+def bulk_delete(db: Session, ids):
+    result = bulk.delete(db, models.Recipe, ids)
+    recipe_cache.invalidate()
+    return result
@@ -0,0 +1,16 @@
+from sqlalchemy import select, exists
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+
+
+def check_references(db: Session, references):
+    """Confirm every referenced row exists using a single SELECT of EXISTS flags.
+
+    references is a list of (model, id, not-found detail) tuples.
+    """
+    if not references:
+        return
+    flags = db.execute(select(*[exists().where(model.id == ref_id) for model, ref_id, _ in references])).one()
+    for (_, _, detail), found in zip(references, flags):
+        if not found:
+            raise HTTPException(status_code=404, detail=detail)
@@ -0,0 +1,124 @@
+from datetime import datetime
+from sqlalchemy import select, func, distinct
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from ..models import models, schemas
+
+# strftime patterns truncating order_date to the start of each bucket
+BUCKET_FORMATS = {
+    "day": {"mysql": "%Y-%m-%d 00:00:00", "sqlite": "%Y-%m-%d 00:00:00"},
+    "hour": {"mysql": "%Y-%m-%d %H:00:00", "sqlite": "%Y-%m-%d %H:00:00"},
+}
+
+
+def in_range(statement, start=None, end=None):
+    # Half-open [start, end) so consecutive ranges never double count
+    if start is not None:
+        statement = statement.where(models.Order.order_date >= start)
+    if end is not None:
+        statement = statement.where(models.Order.order_date < end)
+    return statement
+
+
+def rolled_up(statement, model, start=None, end=None):
+    """Limit a query of archived orders' hourly rollups; an hour counts when its start falls in [start, end)."""
+    if start is not None:
+        statement = statement.where(model.hour >= start)
+    if end is not None:
+        statement = statement.where(model.hour < end)
+    return statement
+
+
+def bucket(db: Session, size, column=models.Order.order_date):
+    dialect = db.get_bind().dialect.name
+    fmt = BUCKET_FORMATS[size][dialect]
+    if dialect == "mysql":
+        return func.date_format(column, fmt)
+    return func.strftime(fmt, column)
+
+
+def rollup_totals(model):
+    return (
+        func.coalesce(func.sum(model.orders), 0).label("orders"),
+        func.coalesce(func.sum(model.units), 0).label("units"),
+        func.coalesce(func.sum(model.revenue), 0).label("revenue"),
+    )
+
+
+def totals():
+    units = func.coalesce(func.sum(models.OrderDetail.amount), 0)
+    # Revenue is priced at the sandwich's current price; orders don't snapshot prices
+    revenue = func.coalesce(func.sum(models.OrderDetail.amount * models.Sandwich.price), 0)
+    return units.label("units"), revenue.label("revenue")
+
+
+def from_orders(*columns):
+    return (
+        select(*columns)
+        .select_from(models.Order)
+        .outerjoin(models.OrderDetail, models.OrderDetail.order_id == models.Order.id)
+        .outerjoin(models.Sandwich, models.Sandwich.id == models.OrderDetail.sandwich_id)
+    )
+
+
+def from_details(*columns):
+    return (
+        select(*columns)
+        .select_from(models.OrderDetail)
+        .join(models.Order, models.Order.id == models.OrderDetail.order_id)
+        .join(models.Sandwich, models.Sandwich.id == models.OrderDetail.sandwich_id)
+    )
+
+
+def summary(db: Session, start=None, end=None):
+    row = db.execute(in_range(from_orders(func.count(distinct(models.Order.id)), *totals()), start, end)).one()
+    archived = db.execute(rolled_up(select(*rollup_totals(models.OrderRollup)), models.OrderRollup, start, end)).one()
+    return schemas.SalesSummary(
+        orders=row[0] + archived.orders,
+        units=row.units + archived.units,
+        revenue=float(row.revenue) + float(archived.revenue),
+    )
+
+
+def by_sandwich(db: Session, start=None, end=None):
+    statement = (
+        from_details(models.Sandwich.id, models.Sandwich.sandwich_name, func.count(distinct(models.Order.id)), *totals())
+        .group_by(models.Sandwich.id, models.Sandwich.sandwich_name)
+    )
+    sales = {
+        row[0]: schemas.SandwichSales(sandwich_id=row[0], sandwich_name=row[1], orders=row[2], units=row.units, revenue=row.revenue)
+        for row in db.execute(in_range(statement, start, end))
+    }
+    archived = (
+        select(models.Sandwich.id, models.Sandwich.sandwich_name, *rollup_totals(models.SandwichRollup))
+        .join(models.Sandwich, models.Sandwich.id == models.SandwichRollup.sandwich_id)
+        .group_by(models.Sandwich.id, models.Sandwich.sandwich_name)
+    )
+    for row in db.execute(rolled_up(archived, models.SandwichRollup, start, end)):
+        sandwich = sales.setdefault(row[0], schemas.SandwichSales(sandwich_id=row[0], sandwich_name=row[1], orders=0, units=0, revenue=0))
+        sandwich.orders += row.orders
+        sandwich.units += row.units
+        sandwich.revenue += float(row.revenue)
+    return [sales[sandwich_id] for sandwich_id in sorted(sales)]
+
+
+def by_period(db: Session, size, start=None, end=None):
+    if size not in BUCKET_FORMATS:
+        raise HTTPException(status_code=422, detail=f"bucket must be one of {', '.join(BUCKET_FORMATS)}")
+    period = bucket(db, size).label("period")
+    statement = from_orders(period, func.count(distinct(models.Order.id)), *totals()).group_by(period)
+    periods = {}
+    for row in db.execute(in_range(statement, start, end)):
+        sales = schemas.PeriodSales(period=row.period, orders=row[1], units=row.units, revenue=row.revenue)
+        periods[sales.period] = sales
+
+    # Rollups are hourly, so they add up into day and hour buckets alike
+    archived_period = bucket(db, size, models.OrderRollup.hour).label("period")
+    archived = select(archived_period, *rollup_totals(models.OrderRollup)).group_by(archived_period)
+    for row in db.execute(rolled_up(archived, models.OrderRollup, start, end)):
+        key = datetime.fromisoformat(row.period)
+        sales = periods.setdefault(key, schemas.PeriodSales(period=key, orders=0, units=0, revenue=0))
+        sales.orders += row.orders
+        sales.units += row.units
+        sales.revenue += float(row.revenue)
+    return [periods[key] for key in sorted(periods)]
@@ -1,38 +1,139 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status, Response, Depends
 from ..models import models, schemas
+from ..dependencies.listing import Listing
+from ..dependencies.cache import recipe_cache
+from ..dependencies.events import inventory_events
+from . import bulk
+
+LISTING = Listing(
+    models.Resource, schemas.Resource,
+    filters=("item", "amount"),
+    sortable=("item", "amount"),
+)
 
 
 def create(db: Session, resource):
     db_resource = models.Resource(
         item=resource.item,
-        amount=resource.amount
+        amount=resource.amount,
+        low_stock_threshold=resource.low_stock_threshold,
     )
     db.add(db_resource)
     db.commit()
     db.refresh(db_resource)
+    publish(db, [db_resource.id])
     return db_resource
 
 
-def read_all(db: Session):
-    return db.query(models.Resource).all()
+def read_all(db: Session, params):
+    return LISTING.fetch(db, params)
+
+
+def versions(db: Session, params):
+    return LISTING.versions(db, params)
+
+
+def stream_all(db: Session, params):
+    return LISTING.stream(db, params)
 
 
 def read_one(db: Session, resource_id):
     return db.query(models.Resource).filter(models.Resource.id == resource_id).first()
 
 
-def update(db: Session, resource_id, resource):
+def update(db: Session, resource_id, resource, versions=None):
+    """Apply the changes, only if the row is still at one of versions when that is given.
+
+    The version check and the write are one UPDATE, so a concurrent change can't slip in between.
+    """
     db_resource = db.query(models.Resource).filter(models.Resource.id == resource_id)
     update_data = resource.model_dump(exclude_unset=True)
-    db_resource.update(update_data, synchronize_session=False)
+    matching = db_resource if versions is None else db_resource.filter(models.Resource.version.in_(versions))
+    if not update_data:
+        return current_version(db_resource, matching)
+    if matching.update({**update_data, "version": models.Resource.version + 1}, synchronize_session=False) == 0:
+        return current_version(db_resource, matching)
     db.commit()
+    # Recipes embed their resource, amount included
+    recipe_cache.invalidate()
+    publish(db, [resource_id])
     return db_resource.first()
 
 
+def adjust(db: Session, resource_id, delta):
+    """Add delta to the stock in a single UPDATE; no read first, so concurrent top-ups never conflict."""
+    db_resource = db.query(models.Resource).filter(models.Resource.id == resource_id)
+    updated = db_resource.filter(models.Resource.amount + delta >= 0).update(
+        {"amount": models.Resource.amount + delta, "version": models.Resource.version + 1},
+        synchronize_session=False,
+    )
+    if updated == 0:
+        if db_resource.first() is None:
+            return None
+        raise HTTPException(status_code=409, detail="Not enough stock to remove")
+    db.commit()
+    recipe_cache.invalidate()
+    publish(db, [resource_id])
+    return db_resource.first()
+
+
+def current_version(db_resource, matching):
+    """Nothing changed: the row if it matches, None if it doesn't exist, 412 if it has moved on."""
+    row = matching.first()
+    if row is None and db_resource.first() is not None:
+        raise HTTPException(status_code=412, detail="Resource was changed by someone else; fetch it again")
+    return row
+
+
 def delete(db: Session, resource_id):
     db_resource = db.query(models.Resource).filter(models.Resource.id == resource_id)
-    db_resource.delete(synchronize_session=False)
+    if db_resource.delete(synchronize_session=False) == 0:
+        return None
     db.commit()
+    # Recipes embed their resource, amount included
+    recipe_cache.invalidate()
+    publish_deleted([resource_id])
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
+
+def bulk_create(db: Session, items):
+    result = bulk.create(db, models.Resource, schemas.ResourceCreate, items)
+    publish(db, succeeded(result))
+    return result
+
+
+def bulk_update(db: Session, items):
+    result = bulk.update(db, models.Resource, schemas.ResourceUpdate, items)
+    recipe_cache.invalidate()
+    publish(db, succeeded(result))
+    return result
+
+
+def bulk_delete(db: Session, ids):
+    result = bulk.delete(db, models.Resource, ids)
+    recipe_cache.invalidate()
+    publish_deleted(succeeded(result))
+    return result
+
+
+def succeeded(result):
+    return [item.id for item in result.results if item.error is None and item.id is not None]
+
+
+def publish(db: Session, resource_ids):
+    """After a commit, push the new level of each resource and an alert for any below its threshold."""
+    # Reading the levels back is only worth a query when someone is listening
+    if not resource_ids or not inventory_events.has_subscribers():
+        return
+    for chunk in bulk.chunks(sorted(set(resource_ids))):
+        for row in db.query(models.Resource).filter(models.Resource.id.in_(chunk)):
+            level = schemas.Resource.model_validate(row, from_attributes=True).model_dump()
+            inventory_events.publish({"type": "level", **level})
+            if row.low_stock_threshold is not None and row.amount < row.low_stock_threshold:
+                inventory_events.publish({"type": "low_stock", **level})
+
+
+def publish_deleted(resource_ids):
+    for resource_id in resource_ids:
+        inventory_events.publish({"type": "deleted", "id": resource_id})
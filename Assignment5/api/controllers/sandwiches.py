@@ -1,6 +1,23 @@
+from sqlalchemy import select, func, and_
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status, Response, Depends
 from ..models import models, schemas
+from ..dependencies.listing import Listing, serialized
+from ..dependencies.database import is_replica
+from ..dependencies.cache import sandwich_cache, recipe_cache
+from . import bulk
+
+LISTING = Listing(
+    models.Sandwich, schemas.Sandwich,
+    filters=("sandwich_name", "price"),
+    sortable=("sandwich_name", "price"),
+)
+
+
+def invalidate():
+    # Recipes embed their sandwich, so a menu change invalidates both
+    sandwich_cache.invalidate()
+    recipe_cache.invalidate()
 
 
 def create(db: Session, sandwich):
@@ -10,29 +27,86 @@ def create(db: Session, sandwich):
     )
     db.add(db_sandwich)
     db.commit()
+    invalidate()
     db.refresh(db_sandwich)
     return db_sandwich
 
 
-def read_all(db: Session):
-    return db.query(models.Sandwich).all()
+def read_all(db: Session, params):
+    return sandwich_cache.get_or_load(("all", params.key()), lambda: serialized(
+        LISTING.fetch(db, params), LISTING.response_schema(params),
+    ), lagging=is_replica(db))
+
+
+def stream_all(db: Session, params):
+    return LISTING.stream(db, params)
+
+
+def availability(db: Session):
+    """How many of each sandwich current stock can build: min over its recipe lines of stock // needed."""
+    def load():
+        buildable = func.min(models.Resource.amount // models.Recipe.amount)
+        rows = db.execute(
+            select(models.Sandwich.id, models.Sandwich.sandwich_name, buildable)
+            .outerjoin(models.Recipe, and_(models.Recipe.sandwich_id == models.Sandwich.id, models.Recipe.amount > 0))
+            .outerjoin(models.Resource, models.Resource.id == models.Recipe.resource_id)
+            .group_by(models.Sandwich.id, models.Sandwich.sandwich_name)
+            .order_by(models.Sandwich.id)
+        ).all()
+        # A sandwich with no recipe lines isn't limited by stock
+        return [
+            schemas.SandwichAvailability(
+                id=sandwich_id,
+                sandwich_name=name,
+                available=None if count is None else max(int(count), 0),
+            )
+            for sandwich_id, name, count in rows
+        ]
+
+    # Availability depends on exactly what recipes embed, so it shares their invalidation
+    return recipe_cache.get_or_load(("availability",), load, lagging=is_replica(db))
 
 
 def read_one(db: Session, sandwich_id):
-    return db.query(models.Sandwich).filter(models.Sandwich.id == sandwich_id).first()
+    def load():
+        row = db.query(models.Sandwich).filter(models.Sandwich.id == sandwich_id).first()
+        return None if row is None else schemas.Sandwich.model_validate(row, from_attributes=True)
+
+    return sandwich_cache.get_or_load(("one", sandwich_id), load, lagging=is_replica(db))
 
 
 def update(db: Session, sandwich_id, sandwich):
     db_sandwich = db.query(models.Sandwich).filter(models.Sandwich.id == sandwich_id)
     update_data = sandwich.model_dump(exclude_unset=True)
-    db_sandwich.update(update_data, synchronize_session=False)
+    if update_data and db_sandwich.update(update_data, synchronize_session=False) == 0:
+        return None
     db.commit()
+    invalidate()
     return db_sandwich.first()
 
 
 def delete(db: Session, sandwich_id):
     db_sandwich = db.query(models.Sandwich).filter(models.Sandwich.id == sandwich_id)
-    db_sandwich.delete(synchronize_session=False)
+    if db_sandwich.delete(synchronize_session=False) == 0:
+        return None
     db.commit()
+    invalidate()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
+
+def bulk_create(db: Session, items):
+    result = bulk.create(db, models.Sandwich, schemas.SandwichCreate, items)
+    invalidate()
+    return result
+
+
+def bulk_update(db: Session, items):
+    result = bulk.update(db, models.Sandwich, schemas.SandwichUpdate, items)
+    invalidate()
+    return result
+
+
+def bulk_delete(db: Session, ids):
+    result = bulk.delete(db, models.Sandwich, ids)
+    invalidate()
+    return result
@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+from .config import conf
+
+
+MISSING = object()
+
+
+class CacheBackend:
+    """Storage behind the read-through cache; implement these to plug in a shared cache."""
+
+    def get(self, key):
+        """Return the stored value, or MISSING."""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def counter(self, key):
+        """Read a counter that is never evicted; 0 if it was never bumped."""
+        raise NotImplementedError
+
+    def incr(self, key):
+        """Atomically bump and return a counter."""
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU cache with a TTL on every entry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def counter(self, key):
+        with self.lock:
+            return self.counters.get(key, 0)
+
+    def incr(self, key):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "backend": type(self).__name__,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class Namespace:
+    """A group of cached reads that are invalidated together.
+
+    Keys embed the namespace generation, so invalidating just bumps the generation;
+    a load that raced with a write stores under the old generation and is never read.
+    """
+
+    def __init__(self, cache, name):
+        self.cache = cache
+        self.name = name
+        self.invalidated_at = float("-inf")
+
+    def generation(self):
+        return self.cache.backend.counter(f"{self.name}:generation")
+
+    def get_or_load(self, key, load, lagging=False):
+        """lagging marks a load from a replica, which may not have the write that invalidated us yet."""
+        if not conf.cache_enabled:
+            return load()
+        full_key = f"{self.name}:{self.generation()}:{key!r}"
+        value = self.cache.backend.get(full_key)
+        if value is MISSING:
+            value = load()
+            recently_invalidated = time.monotonic() - self.invalidated_at < conf.read_your_writes_window
+            if value is not None and not (lagging and recently_invalidated):
+                self.cache.backend.set(full_key, value, conf.cache_ttl)
+        return value
+
+    def invalidate(self):
+        self.invalidated_at = time.monotonic()
+        self.cache.backend.incr(f"{self.name}:generation")
+
+
+class Cache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def namespace(self, name):
+        return Namespace(self, name)
+
+    def stats(self):
+        return self.backend.stats()
+
+
+cache = Cache(MemoryBackend(conf.cache_max_entries))
+sandwich_cache = cache.namespace("sandwiches")
+recipe_cache = cache.namespace("recipes")
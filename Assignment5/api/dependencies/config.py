@@ -1,6 +1,82 @@
+import os
+
+
+def env(name, default, cast=str):
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    if cast is bool:
+        return value.lower() in ("1", "true", "yes", "on")
+    return cast(value)
+
+
 class conf:
-    host = "localhost"
-    database = "sandwich_maker_api"
-    port = 3306
-    user = "root"
-    password = "sarthakgupta"
\ No newline at end of file
+    host = env("DB_HOST", "localhost")
+    database = env("DB_NAME", "sandwich_maker_api")
+    port = env("DB_PORT", 3306, int)
+    user = env("DB_USER", "root")
+    password = env("DB_PASSWORD", "sarthakgupta")
+    # Full SQLAlchemy URL replacing the MySQL settings above, e.g. "sqlite:///./sandwich.db"
+    database_url = env("DATABASE_URL", None)
+    # Optional read replica for GET requests, e.g. "sqlite:///./replica.db"
+    replica_url = env("DATABASE_REPLICA_URL", None)
+    # Seconds a client keeps reading from the primary after it writes
+    read_your_writes_window = env("READ_YOUR_WRITES_WINDOW", 5, float)
+    # "sync" serves requests from PyMySQL sessions on the threadpool, "async" from an asyncio driver
+    db_mode = env("DB_MODE", "sync")
+
+    # Connection pool
+    pool_size = env("DB_POOL_SIZE", 10, int)
+    max_overflow = env("DB_MAX_OVERFLOW", 20, int)
+    pool_timeout = env("DB_POOL_TIMEOUT", 30, int)
+    pool_recycle = env("DB_POOL_RECYCLE", 1800, int)
+    pool_pre_ping = env("DB_POOL_PRE_PING", True, bool)
+    # Per-statement limit in milliseconds (MySQL max_execution_time); 0 disables it
+    statement_timeout_ms = env("DB_STATEMENT_TIMEOUT_MS", 0, int)
+
+    # Rows written per statement by the bulk endpoints
+    bulk_batch_size = env("BULK_BATCH_SIZE", 500, int)
+
+    # Read-through cache for the sandwich menu and recipes
+    cache_enabled = env("CACHE_ENABLED", True, bool)
+    cache_ttl = env("CACHE_TTL", 60, float)
+    cache_max_entries = env("CACHE_MAX_ENTRIES", 1024, int)
+
+    # Production entry point (python -m api.serve): worker processes, seconds in-flight requests
+    # get to finish after SIGTERM, and whether each worker opens its pool and fills the caches first
+    workers = env("WEB_CONCURRENCY", os.cpu_count() or 1, int)
+    graceful_timeout = env("GRACEFUL_TIMEOUT", 30, int)
+    prewarm_enabled = env("PREWARM_ENABLED", False, bool)
+
+    # Write-behind order ingestion (POST /orders/ingest): queue bound, batch size and wait,
+    # order ids reserved per round trip, and how many recent statuses are kept in memory
+    ingest_enabled = env("ORDER_INGEST_ENABLED", False, bool)
+    ingest_queue_size = env("ORDER_INGEST_QUEUE_SIZE", 10000, int)
+    ingest_batch_rows = env("ORDER_INGEST_BATCH_ROWS", 500, int)
+    ingest_batch_ms = env("ORDER_INGEST_BATCH_MS", 50, float)
+    ingest_id_block = env("ORDER_INGEST_ID_BLOCK", 1000, int)
+    ingest_status_entries = env("ORDER_INGEST_STATUS_ENTRIES", 100000, int)
+
+    # Orders older than this many days are moved to the archive tables by `python -m api.archive`,
+    # this many orders per transaction
+    archive_after_days = env("ARCHIVE_AFTER_DAYS", 365, int)
+    archive_batch_size = env("ARCHIVE_BATCH_SIZE", 1000, int)
+
+    # Seconds an Idempotency-Key is remembered for
+    idempotency_ttl = env("IDEMPOTENCY_TTL", 86400, int)
+    # Seconds a key may stay claimed without a stored response before a retry can take it over
+    idempotency_lease = env("IDEMPOTENCY_LEASE", 60, int)
+
+    # Server-Timing headers and /metrics histograms for every request
+    profiling_enabled = env("PROFILING_ENABLED", False, bool)
+
+    # Inventory event stream: events buffered per subscriber, and seconds between keepalives
+    events_queue_size = env("EVENTS_QUEUE_SIZE", 100, int)
+    events_keepalive = env("EVENTS_KEEPALIVE", 15, float)
+
+    # Cache-Control sent with the ETag-tagged GET routes
+    cache_control = {
+        "sandwiches": env("CACHE_CONTROL_SANDWICHES", "public, max-age=30"),
+        "resources": env("CACHE_CONTROL_RESOURCES", "no-cache"),
+        "order": env("CACHE_CONTROL_ORDER", "private, no-cache"),
+    }
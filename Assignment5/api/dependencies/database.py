@@ -1,23 +1,272 @@
-from sqlalchemy import create_engine
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 # from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from fastapi import Request
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from .config import conf
+from . import profiling
 from urllib.parse import quote_plus
 
+# asyncio drivers standing in for the sync DBAPI of each backend
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite"}
+# Requests a replica may serve; anything else goes to the primary
+READ_METHODS = {"GET", "HEAD"}
+# Holds the time until which a client that just wrote keeps reading from the primary
+PRIMARY_COOKIE = "db_primary_until"
 
 
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{conf.user}:{quote_plus(conf.password)}@{conf.host}:{conf.port}/{conf.database}?charset=utf8mb4"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL
-)
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+def timed(pool_class):
+    """Subclass a queue pool so every checkout records how long it waited for a connection."""
+
+    class TimedPool(pool_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.stats = PoolStats()
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except PoolTimeoutError:
+                self.stats.timeouts += 1
+                raise
+            finally:
+                waited = time.perf_counter() - start
+                self.stats.checkouts += 1
+                self.stats.wait_total += waited
+                self.stats.wait_max = max(self.stats.wait_max, waited)
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+TimedQueuePool = timed(QueuePool)
+TimedAsyncQueuePool = timed(AsyncAdaptedQueuePool)
+
+
+def engine_options(url, is_async=False, **overrides):
+    url = make_url(url)
+    options = {"pool_pre_ping": conf.pool_pre_ping, "pool_recycle": conf.pool_recycle}
+    # In-memory SQLite lives in a single connection, so there is no queue to size
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=conf.pool_size,
+        max_overflow=conf.max_overflow,
+        pool_timeout=conf.pool_timeout,
+    )
+    options.update(overrides)
+    return options
+
+
+def set_statement_timeout(engine):
+    if engine.dialect.name != "mysql" or not conf.statement_timeout_ms:
+        return
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET SESSION max_execution_time = {int(conf.statement_timeout_ms)}")
+        cursor.close()
+
+
+def build_engine(url, **overrides):
+    engine = create_engine(url, **engine_options(url, **overrides))
+    set_statement_timeout(engine)
+    return engine
+
+
+def build_async_engine(url, **overrides):
+    engine = create_async_engine(async_url(url), **engine_options(url, is_async=True, **overrides))
+    set_statement_timeout(engine.sync_engine)
+    return engine
+
+
+def async_url(url):
+    url = make_url(url)
+    return url.set(drivername=f"{url.get_backend_name()}+{ASYNC_DRIVERS[url.get_backend_name()]}")
+
+
+def pool_status(engine):
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(
+            checkouts=stats.checkouts,
+            timeouts=stats.timeouts,
+            wait_avg_ms=round(stats.wait_total / stats.checkouts * 1000, 3) if stats.checkouts else 0.0,
+            wait_max_ms=round(stats.wait_max * 1000, 3),
+        )
+    return status
+
+
+class ReplicaSession(Session):
+    """A session on the read replica; flushing a change through it is a bug."""
+
+
+@event.listens_for(ReplicaSession, "before_flush")
+def refuse_writes(session, flush_context, instances):
+    raise RuntimeError("Attempted to write through a read replica session")
+
+
+def is_replica(db):
+    return isinstance(db, ReplicaSession)
+
+
+def use_replica(request: Request):
+    if request.method not in READ_METHODS:
+        return False
+    try:
+        primary_until = float(request.cookies.get(PRIMARY_COOKIE, 0))
+    except ValueError:
+        primary_until = 0
+    return primary_until < time.time()
+
+
+class ReadYourWritesMiddleware:
+    """After a successful write, pin the client's reads to the primary for conf.read_your_writes_window seconds."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS or not replica_configured():
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = conf.read_your_writes_window
+                cookie = f"{PRIMARY_COOKIE}={time.time() + window:.3f}; Max-Age={math.ceil(window)}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+SQLALCHEMY_DATABASE_URL = conf.database_url or f"mysql+pymysql://{conf.user}:{quote_plus(conf.password)}@{conf.host}:{conf.port}/{conf.database}?charset=utf8mb4"
+engine = build_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+replica_engine = build_engine(conf.replica_url) if conf.replica_url else None
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine, class_=ReplicaSession) if replica_engine else None
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+if conf.db_mode == "async":
+    async_engine = build_async_engine(SQLALCHEMY_DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+    async_replica_engine = build_async_engine(conf.replica_url) if conf.replica_url else None
+    AsyncReplicaSessionLocal = async_sessionmaker(
+        async_replica_engine, autoflush=False, sync_session_class=ReplicaSession,
+    ) if async_replica_engine else None
+
+    def replica_configured():
+        return AsyncReplicaSessionLocal is not None
+
+    async def get_db(request: Request):
+        factory = AsyncReplicaSessionLocal if replica_configured() and use_replica(request) else AsyncSessionLocal
+        async with factory() as db:
+            yield db
+
+    @asynccontextmanager
+    async def primary_session():
+        async with AsyncSessionLocal() as db:
+            yield db
+else:
+    async_engine = None
+    async_replica_engine = None
+
+    def replica_configured():
+        return ReplicaSessionLocal is not None
+
+    def get_db(request: Request):
+        factory = ReplicaSessionLocal if replica_configured() and use_replica(request) else SessionLocal
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @asynccontextmanager
+    async def primary_session():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+def serving_engines():
+    """The engines requests use: the async ones in async mode, else the sync ones."""
+    engines = (async_engine, async_replica_engine) if async_engine is not None else (engine, replica_engine)
+    return [e for e in engines if e is not None]
+
+
+async def open_pools():
+    """Connect each serving engine's whole pool now, so the first requests don't pay for it."""
+    for e in serving_engines():
+        size = e.pool.size() if isinstance(e.pool, QueuePool) else 1
+        if isinstance(e, AsyncEngine):
+            connections = [await e.connect() for _ in range(size)]
+            for connection in connections:
+                await connection.close()
+        else:
+            await run_in_threadpool(connect_all, e, size)
+
+
+def connect_all(e, size):
+    connections = [e.connect() for _ in range(size)]
+    for connection in connections:
+        connection.close()
+
+
+async def dispose_engines():
+    for e in (engine, replica_engine, async_engine, async_replica_engine):
+        if isinstance(e, AsyncEngine):
+            await e.dispose()
+        elif e is not None:
+            e.dispose()
+
+
+def dispose_after_fork():
+    # A forked child shares the parent's sockets; drop the inherited pools without closing them
+    for e in (engine, replica_engine, async_engine, async_replica_engine):
+        if e is not None:
+            (e.sync_engine if isinstance(e, AsyncEngine) else e).dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=dispose_after_fork)
+
+
+async def run(db, fn, **kwargs):
+    """Call a controller function without blocking the event loop, whichever session type get_db yields."""
+    with profiling.controller():
+        if isinstance(db, AsyncSession):
+            return await db.run_sync(fn, **kwargs)
+        return await run_in_threadpool(fn, db, **kwargs)
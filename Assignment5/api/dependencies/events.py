@@ -0,0 +1,85 @@
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from fastapi.responses import StreamingResponse
+from .config import conf
+
+
+class Subscription:
+    """One subscriber's queue, bound to the event loop it reads from."""
+
+    def __init__(self, loop, max_events):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_events)
+        self.dropped = 0
+
+    def put(self, event):
+        # A slow reader loses its oldest events rather than stalling publishers
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class EventBus:
+    """In-process pub/sub; publish is safe from request threads, subscribers read on the event loop."""
+
+    def __init__(self, max_events):
+        self.max_events = max_events
+        self.subscriptions = set()
+        self.lock = threading.Lock()
+
+    def has_subscribers(self):
+        return bool(self.subscriptions)
+
+    @contextmanager
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop(), self.max_events)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self.lock:
+                self.subscriptions.discard(subscription)
+
+    def publish(self, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; its context manager will remove it
+                pass
+
+
+async def server_sent_events(bus, keepalive=None):
+    """Relay a bus as Server-Sent Events; Starlette cancels this when the client disconnects."""
+    keepalive = keepalive or conf.events_keepalive
+    with bus.subscribe() as subscription:
+        # Sent once subscribed, so the client knows nothing after this point is missed
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def event_stream_response(bus):
+    return StreamingResponse(
+        server_sent_events(bus),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+inventory_events = EventBus(conf.events_queue_size)
@@ -0,0 +1,94 @@
+import hashlib
+from functools import lru_cache
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+
+# Sized for every route's response type plus the cached sparse-fieldset schemas
+@lru_cache(maxsize=512)
+def adapter(response_type):
+    return TypeAdapter(response_type)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def version_etag(version):
+    return f'"{version}"'
+
+
+def if_match_versions(if_match):
+    """Row versions an If-Match header accepts, or None when any version will do.
+
+    Tags other than the strong "<version>" ones from version_etag can never match.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = []
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.append(int(tag[1:-1]))
+    return versions
+
+
+def response_headers(response: Response):
+    # Returning a Response bypasses FastAPI's merge of headers set on the injected one
+    return {key: value for key, value in response.headers.items() if key != "content-length"}
+
+
+def hash_etag(content: bytes):
+    return '"' + hashlib.blake2b(content, digest_size=16).hexdigest() + '"'
+
+
+def encode(data, response_type):
+    """The JSON body of data and its ETag, a hash of the body.
+
+    Data with an `encoded` slot (a Rows page) keeps them, so a page served from the cache
+    is validated, serialized and hashed once rather than on every hit.
+    """
+    encoded = getattr(data, "encoded", None)
+    if encoded is not None and encoded[0] == response_type:
+        return encoded[1], encoded[2]
+    body = adapter(response_type).dump_json(
+        adapter(response_type).validate_python(data, from_attributes=True)
+    )
+    etag = hash_etag(body)
+    if hasattr(data, "encoded"):
+        data.encoded = (response_type, body, etag)
+    return body, etag
+
+
+def not_modified(request: Request, response: Response, etag, cache_control):
+    """A 304 if the client already has etag, else None; nothing is loaded or serialized for it."""
+    if not etag_matches(request.headers.get("if-none-match"), etag):
+        return None
+    headers = response_headers(response)
+    headers.update({"ETag": etag, "Cache-Control": cache_control})
+    return Response(status_code=304, headers=headers)
+
+
+def conditional_response(request: Request, response: Response, data, response_type, cache_control, etag=None):
+    """Serialize data once, tag it with a hash of the body, and answer 304 if the client already has it.
+
+    A caller that tagged the data from row versions instead passes that etag; the body is
+    then only built for a 200.
+    """
+    body = None
+    if etag is None:
+        body, etag = encode(data, response_type)
+    cached = not_modified(request, response, etag, cache_control)
+    if cached is not None:
+        return cached
+    if body is None:
+        body = adapter(response_type).dump_json(adapter(response_type).validate_python(data, from_attributes=True))
+    headers = response_headers(response)
+    headers.update({"ETag": etag, "Cache-Control": cache_control})
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from ..controllers import orders
+from . import database
+from .config import conf
+
+logger = logging.getLogger(__name__)
+
+
+class OrderIngest:
+    """Write-behind queue for new orders: accept now with a reserved id, commit later in batches."""
+
+    def __init__(self):
+        self.queue = None
+        self.worker = None
+        self.closing = False
+        self.ids = deque()
+        self.reserving = None
+        self.sessions = None
+        # id -> (status, error); old entries fall off, and the status route then asks the database
+        self.statuses = OrderedDict()
+
+    def start(self, sessions=None):
+        self.sessions = sessions or database.SessionLocal
+        self.closing = False
+        # Reserved ids and statuses belong to the database this was last started against
+        self.ids.clear()
+        self.statuses.clear()
+        self.queue = asyncio.Queue(maxsize=conf.ingest_queue_size)
+        self.reserving = asyncio.Lock()
+        self.worker = asyncio.create_task(self.work())
+
+    async def stop(self):
+        """Stop accepting orders and commit everything already accepted."""
+        if self.worker is None:
+            return
+        self.closing = True
+        await self.queue.put(None)
+        await self.queue.join()
+        self.worker.cancel()
+        try:
+            await self.worker
+        except asyncio.CancelledError:
+            pass
+        self.worker = None
+
+    async def next_id(self):
+        async with self.reserving:
+            if not self.ids:
+                self.ids.extend(await run_in_threadpool(self.with_session, orders.reserve_ids, conf.ingest_id_block))
+            return self.ids.popleft()
+
+    async def submit(self, order):
+        if self.worker is None:
+            raise HTTPException(status_code=503, detail="Order ingestion is not enabled")
+        if self.closing:
+            raise HTTPException(status_code=503, detail="Shutting down", headers={"Retry-After": "5"})
+        if self.queue.full():
+            raise HTTPException(status_code=503, detail="Order queue is full", headers={"Retry-After": "1"})
+        order_id = await self.next_id()
+        if self.queue.full():
+            # Filled up while we reserved; keep the id for the next order
+            self.ids.appendleft(order_id)
+            raise HTTPException(status_code=503, detail="Order queue is full", headers={"Retry-After": "1"})
+        self.queue.put_nowait((order_id, order))
+        self.set_status(order_id, "queued")
+        return order_id
+
+    def status(self, order_id):
+        return self.statuses.get(order_id)
+
+    def set_status(self, order_id, status, error=None):
+        self.statuses[order_id] = (status, error)
+        self.statuses.move_to_end(order_id)
+        while len(self.statuses) > conf.ingest_status_entries:
+            self.statuses.popitem(last=False)
+
+    async def work(self):
+        while True:
+            batch = []
+            item = await self.queue.get()
+            # Gather up to a batch's worth of rows, waiting at most ingest_batch_ms after the first;
+            # None is stop() asking for whatever is already gathered to be written now
+            deadline = time.monotonic() + conf.ingest_batch_ms / 1000
+            while item is not None:
+                batch.append(item)
+                timeout = deadline - time.monotonic()
+                if len(batch) >= conf.ingest_batch_rows or timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                self.queue.task_done()
+            try:
+                if batch:
+                    await self.flush(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def flush(self, batch):
+        try:
+            result = await run_in_threadpool(self.with_session, orders.create_batch, batch)
+        except Exception as e:
+            logger.exception("Failed to commit %d queued orders", len(batch))
+            for order_id, _ in batch:
+                self.set_status(order_id, "failed", str(e))
+            return
+        for item in result.results:
+            if item.error is None:
+                self.set_status(item.index, "committed")
+            else:
+                self.set_status(item.index, "failed", item.error)
+
+    def with_session(self, fn, *args):
+        db = self.sessions()
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+
+order_ingest = OrderIngest()
@@ -0,0 +1,308 @@
+import base64
+import copy
+import inspect
+import json
+import orjson
+from datetime import datetime
+from decimal import Decimal
+from functools import cmp_to_key, lru_cache
+from itertools import chain
+from typing import Optional
+from fastapi import HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import create_model
+from pydantic.fields import FieldInfo
+from pydantic_core import to_jsonable_python
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from .http_cache import adapter, conditional_response, hash_etag, response_headers
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+# Query parameters that control the listing itself rather than filtering it
+RESERVED = {"limit", "after", "cursor", "stream", "sort", "fields", "include_archived"}
+
+OPERATORS = {
+    "": lambda column, value: column == value,
+    "gt": lambda column, value: column > value,
+    "gte": lambda column, value: column >= value,
+    "lt": lambda column, value: column < value,
+    "lte": lambda column, value: column <= value,
+}
+
+
+def split(value):
+    return tuple(part.strip() for part in value.split(",") if part.strip()) if value else ()
+
+
+class ListParams:
+    """Pagination, filter, sort and sparse-fieldset query parameters shared by every list route."""
+
+    def __init__(
+        self,
+        request: Request,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[int] = Query(None, ge=0, description="Return rows with id greater than this cursor"),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page of a custom sort"),
+        stream: bool = Query(False, description="Stream every matching row as NDJSON"),
+        sort: Optional[str] = Query(None, description="Comma-separated fields; prefix with - to sort descending"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    ):
+        self.after = after
+        self.cursor = cursor
+        self.stream = stream
+        # A stream is unbounded unless the client asks for a limit
+        self.limit = limit if (limit is not None or stream) else DEFAULT_PAGE_SIZE
+        self.sort = split(sort)
+        # Duplicates and order don't change the result, so they mustn't make a new cache entry either
+        self.fields = tuple(sorted(set(split(fields))))
+        # Anything else is a filter such as ?customer_name=Jane or ?amount_lt=5
+        self.filters = tuple(sorted(
+            (name, value) for name, value in request.query_params.multi_items() if name not in RESERVED
+        ))
+
+    @classmethod
+    def default(cls):
+        """The params of a request with no query string, e.g. a bare GET /sandwiches/."""
+        defaults = {
+            name: parameter.default.default
+            for name, parameter in inspect.signature(cls.__init__).parameters.items()
+            if isinstance(parameter.default, FieldInfo)
+        }
+        return cls(Request({"type": "http", "query_string": b"", "headers": []}), **defaults)
+
+    def key(self):
+        """Hashable identity of the listing, for cached reads."""
+        return (self.limit, self.after, self.cursor, self.sort, self.fields, self.filters)
+
+
+class Rows(list):
+    """One page of rows plus the cursor for the next page, if there may be one."""
+    next_after = None
+    next_cursor = None
+    # (response type, body, ETag) once conditional_response has serialized the page
+    encoded = None
+
+
+def coerce(column, value):
+    python_type = column.type.python_type
+    try:
+        if python_type is datetime:
+            return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+        if python_type is Decimal:
+            return Decimal(str(value))
+        return python_type(value)
+    except (TypeError, ValueError, ArithmeticError):
+        raise HTTPException(status_code=422, detail=f"Invalid value for {column.key}: {value!r}")
+
+
+class Listing:
+    """Declares which columns of a model can be filtered, sorted and selected, and builds list queries."""
+
+    def __init__(self, model, schema, filters=(), sortable=()):
+        self.model = model
+        self.schema = schema
+        self.columns = {column.key: column for column in model.__table__.columns}
+        self.filters = {name: self.columns[name] for name in filters}
+        self.sortable = {name: self.columns[name] for name in ("id", *sortable)}
+        # Sparse fieldsets are limited to the scalar fields the schema exposes
+        self.selectable = [name for name in schema.model_fields if name in self.columns]
+
+    def filter_clauses(self, params):
+        clauses = []
+        for name, value in params.filters:
+            field, operator = name, ""
+            if field not in self.filters and "_" in name:
+                field, operator = name.rsplit("_", 1)
+            if field not in self.filters or operator not in OPERATORS:
+                # A typo'd filter silently matching everything is worse than an error
+                raise HTTPException(status_code=422, detail=f"Cannot filter by {name}; choose from {', '.join(self.filters)}")
+            column = self.filters[field]
+            clauses.append(OPERATORS[operator](column, coerce(column, value)))
+        return clauses
+
+    def order(self, params):
+        order = []
+        for name in params.sort:
+            descending = name.startswith("-")
+            column = self.sortable.get(name.lstrip("-"))
+            if column is None:
+                raise HTTPException(status_code=422, detail=f"Cannot sort by {name.lstrip('-')}; choose from {', '.join(self.sortable)}")
+            if column.key != "id":
+                order.append((column, descending))
+        # id breaks ties, which keeps keyset cursors unambiguous
+        order.append((self.columns["id"], False))
+        return order
+
+    def selected(self, params):
+        for name in params.fields:
+            if name not in self.selectable:
+                raise HTTPException(status_code=422, detail=f"Unknown field {name}; choose from {', '.join(self.selectable)}")
+        # In schema order, so each subset of fields maps to one narrowed schema
+        return tuple(name for name in self.selectable if name in params.fields)
+
+    def query(self, db, params, options=(), plain=False):
+        order = self.order(params)
+        # plain selects every scalar field as a tuple, skipping ORM identity and hydration
+        fields = self.selected(params) or (tuple(self.selectable) if plain else ())
+        if fields:
+            # Cursors need the id and sort values even when the client didn't ask for them
+            wanted = dict.fromkeys([*fields, *(column.key for column, _ in order)])
+            query = db.query(*(self.columns[name] for name in wanted))
+        else:
+            query = db.query(self.model).options(*options)
+
+        query = query.filter(*self.filter_clauses(params))
+        if params.after is not None:
+            if len(order) > 1:
+                raise HTTPException(status_code=422, detail="Use cursor, not after, to page a custom sort")
+            query = query.filter(self.model.id > params.after)
+        if params.cursor is not None:
+            query = query.filter(self.after_cursor(order, params.cursor))
+
+        query = query.order_by(*(column.desc() if descending else column for column, descending in order))
+        if params.limit is not None:
+            query = query.limit(params.limit)
+        return query
+
+    def after_cursor(self, order, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = [coerce(column, value) for (column, _), value in zip(order, values, strict=True)]
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+        # (a, b, id) > (x, y, z) spelled out so each column can sort in its own direction
+        clauses = []
+        for i, (column, descending) in enumerate(order):
+            beyond = column < values[i] if descending else column > values[i]
+            clauses.append(and_(*(c == v for (c, _), v in zip(order[:i], values[:i])), beyond))
+        return or_(*clauses)
+
+    def fetch(self, db, params, options=(), plain=False):
+        return self.paged(Rows(self.query(db, params, options, plain)), params)
+
+    def versions(self, db, params):
+        """The page's ETag from its row ids and versions, and its cursors, without loading the rows.
+
+        Only for models whose every write bumps version, so an unchanged tag means an unchanged page.
+        """
+        self.selected(params)
+        narrowed = copy.copy(params)
+        narrowed.fields = ("id", "version")
+        page = mapped(self.fetch(db, narrowed), lambda row: (row.id, row.version))
+        return hash_etag(repr((params.key(), list(page))).encode()), page
+
+    def merge(self, params, *pages):
+        """One page out of pages fetched with the same params from tables that share this listing's columns."""
+        order = self.order(params)
+
+        def compare(a, b):
+            for column, descending in order:
+                x, y = getattr(a, column.key), getattr(b, column.key)
+                if x != y:
+                    return -1 if (x < y) != descending else 1
+            return 0
+
+        rows = Rows(sorted(chain.from_iterable(pages), key=cmp_to_key(compare)))
+        if params.limit is not None:
+            del rows[params.limit:]
+        return self.paged(rows, params)
+
+    def paged(self, rows, params):
+        if params.limit is not None and len(rows) == params.limit:
+            order = self.order(params)
+            last = rows[-1]
+            if len(order) == 1:
+                rows.next_after = last.id
+            else:
+                values = to_jsonable_python([getattr(last, column.key) for column, _ in order])
+                rows.next_cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        return rows
+
+    def stream(self, db, params, options=()):
+        return self.query(db, params, options).yield_per(STREAM_BATCH_SIZE)
+
+    def response_schema(self, params):
+        return fields_schema(self.schema, self.selected(params))
+
+
+# Bounded anyway: the subsets of a schema's fields are finite, but there can be a lot of them
+@lru_cache(maxsize=256)
+def fields_schema(schema, fields):
+    """The schema narrowed to the requested fields, serializing each exactly as the full schema would."""
+    if not fields:
+        return schema
+    return create_model(
+        f"{schema.__name__}Fields",
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name].default) for name in fields},
+    )
+
+
+def mapped(rows, convert):
+    """Convert each row of a page, keeping the page's cursors."""
+    page = Rows(convert(row) for row in rows)
+    page.next_after = getattr(rows, "next_after", None)
+    page.next_cursor = getattr(rows, "next_cursor", None)
+    return page
+
+
+def serialized(rows, schema):
+    """Validate rows into schema objects, keeping the page's cursors."""
+    return mapped(rows, lambda row: schema.model_validate(row, from_attributes=True))
+
+
+def set_next_cursor(response: Response, rows):
+    # A full page means there may be more rows; hand back the cursor for the next one
+    if getattr(rows, "next_after", None) is not None:
+        response.headers["X-Next-After"] = str(rows.next_after)
+    if getattr(rows, "next_cursor", None) is not None:
+        response.headers["X-Next-Cursor"] = rows.next_cursor
+
+
+def list_response(request: Request, response: Response, rows, listing, params, cache_control=None, etag=None):
+    set_next_cursor(response, rows)
+    schema = listing.response_schema(params)
+    if cache_control is not None:
+        return conditional_response(request, response, rows, list[schema], cache_control, etag)
+    if params.fields:
+        # Partial rows don't fit the route's response_model, so serialize them here
+        body = adapter(list[schema]).dump_json(adapter(list[schema]).validate_python(rows, from_attributes=True))
+        return Response(content=body, media_type="application/json", headers=response_headers(response))
+    return rows
+
+
+def plain_response(response: Response, rows):
+    """Encode a page of plain dicts already shaped like the response schema, skipping response_model validation."""
+    set_next_cursor(response, rows)
+    return Response(content=orjson.dumps(rows), media_type="application/json", headers=response_headers(response))
+
+
+async def stream_rows(db, fn, **kwargs):
+    """Build a controller's streaming query and return an iterable over its server-side cursor."""
+    if isinstance(db, AsyncSession):
+        # Building the query doesn't execute anything, so the sync facade is safe here
+        query = fn(db.sync_session, **kwargs)
+        execution_options = {"yield_per": STREAM_BATCH_SIZE}
+        if len(query.column_descriptions) == 1 and isinstance(query.column_descriptions[0]["expr"], type):
+            return await db.stream_scalars(query.statement, execution_options=execution_options)
+        return await db.stream(query.statement, execution_options=execution_options)
+    return fn(db, **kwargs)
+
+
+def ndjson_response(rows, schema):
+    def dump(row):
+        return schema.model_validate(row, from_attributes=True).model_dump_json() + "\n"
+
+    if hasattr(rows, "__aiter__"):
+        async def generate():
+            async for row in rows:
+                yield dump(row)
+    else:
+        def generate():
+            for row in rows:
+                yield dump(row)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -0,0 +1,157 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .config import conf
+
+# Upper bounds, in seconds, of the histogram buckets behind /metrics
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+current = ContextVar("profile", default=None)
+
+
+class Profile:
+    """Timings for one request. Shared by reference with the threads and greenlets serving it."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db = 0.0
+        self.statements = 0
+        self.controller = 0.0
+        self.controller_end = None
+
+    def phases(self, now):
+        total = now - self.start
+        return {
+            "total": total,
+            "db": self.db,
+            # Controller time outside the cursor: building queries and hydrating rows into objects
+            "orm": max(self.controller - self.db, 0.0),
+            # Whatever happens after the last controller call returns is response_model validation and JSON encoding
+            "serialize": now - self.controller_end if self.controller_end is not None else 0.0,
+        }
+
+
+@contextmanager
+def controller():
+    """Time a controller call into the current request's profile, if there is one."""
+    profile = current.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.controller_end = time.perf_counter()
+        profile.controller += profile.controller_end - start
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current.get()
+    started = conn.info.get("profile_started")
+    if profile is None or not started:
+        return
+    profile.db += time.perf_counter() - started.pop()
+    profile.statements += 1
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+
+class Metrics:
+    """Per-route histograms of each request phase, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.histograms = {}
+        self.statements = {}
+
+    def observe(self, method, route, phases, statements):
+        with self.lock:
+            for phase, seconds in phases.items():
+                self.histograms.setdefault((method, route, phase), Histogram()).observe(seconds)
+            self.statements[(method, route)] = self.statements.get((method, route), 0) + statements
+
+    def render(self):
+        lines = [
+            "# HELP api_request_seconds Time spent serving a request, split by phase.",
+            "# TYPE api_request_seconds histogram",
+        ]
+        with self.lock:
+            for (method, route, phase), histogram in sorted(self.histograms.items()):
+                labels = f'method="{method}",route="{route}",phase="{phase}"'
+                cumulative = 0
+                for bound, count in zip((*BUCKETS, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f'api_request_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"api_request_seconds_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"api_request_seconds_count{{{labels}}} {cumulative}")
+            lines += [
+                "# HELP api_db_statements_total SQL statements executed while serving requests.",
+                "# TYPE api_db_statements_total counter",
+            ]
+            for (method, route), count in sorted(self.statements.items()):
+                lines.append(f'api_db_statements_total{{method="{method}",route="{route}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def server_timing(phases, statements):
+    return ", ".join(
+        f'{phase};dur={seconds * 1000:.3f}' + (f';desc="statements: {statements}"' if phase == "db" else "")
+        for phase, seconds in phases.items()
+    )
+
+
+class ProfilingMiddleware:
+    """Adds Server-Timing to every response and feeds /metrics, when conf.profiling_enabled is on."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not conf.profiling_enabled:
+            return await self.app(scope, receive, send)
+
+        profile = Profile()
+        token = current.set(profile)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                phases = profile.phases(time.perf_counter())
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", server_timing(phases, profile.statements).encode()),
+                ]
+                # The route template, not the raw path, keeps the label set bounded
+                route = scope.get("route")
+                metrics.observe(scope["method"], getattr(route, "path", "unmatched"), phases, profile.statements)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current.reset(token)
@@ -1,14 +1,50 @@
-from fastapi import Depends, FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import Body, Depends, FastAPI, Header, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from fastapi.middleware.cors import CORSMiddleware
 
 from .models import models, schemas
-from .controllers import orders, sandwiches, resources, recipes, order_details
-from .dependencies.database import engine, get_db
-
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
+from .controllers import orders, sandwiches, resources, recipes, order_details, reports, idempotency
+from .dependencies.database import (
+    engine, async_engine, replica_engine, async_replica_engine, get_db, run, pool_status, ReadYourWritesMiddleware,
+    primary_session, open_pools, dispose_engines,
+)
+from .dependencies.cache import cache
+from .dependencies.config import conf
+from .dependencies.ingest import order_ingest
+from .dependencies.events import inventory_events, event_stream_response
+from .dependencies.http_cache import conditional_response, if_match_versions, not_modified, version_etag
+from .dependencies.profiling import ProfilingMiddleware, metrics
+from .dependencies.listing import ListParams, list_response, plain_response, ndjson_response, set_next_cursor, stream_rows
+
+
+async def prewarm():
+    """Open the pool and load the menu and recipes into the cache before taking traffic."""
+    await open_pools()
+    # The params of a bare GET /sandwiches/ or /recipes/, so those requests hit the warmed entries
+    params = ListParams.default()
+    async with primary_session() as db:
+        await run(db, sandwiches.read_all, params=params)
+        await run(db, sandwiches.availability)
+        await run(db, recipes.read_all, params=params)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if conf.prewarm_enabled:
+        await prewarm()
+    if conf.ingest_enabled:
+        order_ingest.start()
+    yield
+    # Runs once the server has stopped taking requests and in-flight ones have finished;
+    # commit every order already accepted, then close the pooled connections
+    await order_ingest.stop()
+    await dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["*"]
 
@@ -19,177 +55,388 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# A no-op unless conf.profiling_enabled is set
+app.add_middleware(ProfilingMiddleware)
+# A no-op unless a read replica is configured
+app.add_middleware(ReadYourWritesMiddleware)
 
 
 @app.post("/orders/", response_model=schemas.Order, tags=["Orders"])
-def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
-    return orders.create(db=db, order=order)
+async def create_order(order: schemas.OrderCreate, idempotency_key: Optional[str] = Header(None, max_length=255), db: Session = Depends(get_db)):
+    if idempotency_key is None:
+        return await run(db, orders.create, order=order)
+    return await run(
+        db, idempotency.create_once,
+        scope="orders", key=idempotency_key, payload=order, create=orders.create, schema=schemas.Order,
+    )
+
+
+@app.post("/orders/place", response_model=schemas.Order, tags=["Orders"])
+async def place_order(order: schemas.OrderPlace, db: Session = Depends(get_db)):
+    return await run(db, orders.place, order=order)
+
+
+@app.post("/orders/ingest", response_model=schemas.OrderIngestStatus, status_code=202, tags=["Orders"])
+async def ingest_order(order: schemas.OrderCreate, response: Response):
+    order_id = await order_ingest.submit(order)
+    status_url = app.url_path_for("read_ingested_order", order_id=order_id)
+    response.headers["Location"] = status_url
+    return schemas.OrderIngestStatus(id=order_id, status="queued", status_url=status_url)
+
+
+@app.get("/orders/ingest/{order_id}", response_model=schemas.OrderIngestStatus, tags=["Orders"])
+async def read_ingested_order(order_id: int, db: Session = Depends(get_db)):
+    status_url = app.url_path_for("read_ingested_order", order_id=order_id)
+    known = order_ingest.status(order_id)
+    if known is not None:
+        return schemas.OrderIngestStatus(id=order_id, status=known[0], status_url=status_url, error=known[1])
+    # Statuses live in the memory of the worker that took the order, and only for a while. Without
+    # one, the order is committed if it exists; if not, another worker may still have it queued.
+    if await run(db, orders.read_one, order_id=order_id) is None:
+        return schemas.OrderIngestStatus(id=order_id, status="unknown", status_url=status_url)
+    return schemas.OrderIngestStatus(id=order_id, status="committed", status_url=status_url)
 
 
 @app.get("/orders/", response_model=list[schemas.Order], tags=["Orders"])
-def read_orders(db: Session = Depends(get_db)):
-    return orders.read_all(db)
+async def read_orders(
+    request: Request,
+    response: Response,
+    params: ListParams = Depends(),
+    include_archived: bool = Query(False, description="Also list orders moved to the archive"),
+    db: Session = Depends(get_db),
+):
+    if include_archived:
+        if params.stream:
+            raise HTTPException(status_code=422, detail="Archived orders can't be streamed; page through them instead")
+        rows = await run(db, orders.read_all_with_archived, params=params)
+        return list_response(request, response, rows, orders.LISTING, params)
+    if params.stream:
+        return ndjson_response(await stream_rows(db, orders.stream_all, params=params), orders.LISTING.response_schema(params))
+    if params.fields:
+        rows = await run(db, orders.read_all, params=params)
+        return list_response(request, response, rows, orders.LISTING, params)
+    # Plain rows encoded with orjson; byte-for-byte what response_model would produce
+    return plain_response(response, await run(db, orders.read_all_plain, params=params))
+
+
+@app.post("/orders/bulk", response_model=schemas.BulkResult, tags=["Orders"])
+async def bulk_create_orders(items: list[dict] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, orders.bulk_create, items=items)
+
+
+@app.patch("/orders/bulk", response_model=schemas.BulkResult, tags=["Orders"])
+async def bulk_update_orders(items: list[dict] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, orders.bulk_update, items=items)
+
+
+@app.delete("/orders/bulk", response_model=schemas.BulkResult, tags=["Orders"])
+async def bulk_delete_orders(ids: list[int] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, orders.bulk_delete, ids=ids)
 
 
 @app.get("/orders/{order_id}", response_model=schemas.Order, tags=["Orders"])
-def read_one_order(order_id: int, db: Session = Depends(get_db)):
-    order = orders.read_one(db, order_id=order_id)
+async def read_one_order(order_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    order = await run(db, orders.read_one, order_id=order_id)
     if order is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    return conditional_response(request, response, order, schemas.Order, conf.cache_control["order"])
 
 
 @app.put("/orders/{order_id}", response_model=schemas.Order, tags=["Orders"])
-def update_one_order(order_id: int, order: schemas.OrderUpdate, db: Session = Depends(get_db)):
-    order_db = orders.read_one(db, order_id=order_id)
+async def update_one_order(order_id: int, order: schemas.OrderUpdate, db: Session = Depends(get_db)):
+    order_db = await run(db, orders.update, order=order, order_id=order_id)
     if order_db is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    return orders.update(db=db, order=order, order_id=order_id)
+    return order_db
 
 
 @app.delete("/orders/{order_id}", tags=["Orders"])
-def delete_one_order(order_id: int, db: Session = Depends(get_db)):
-    order = orders.read_one(db, order_id=order_id)
-    if order is None:
+async def delete_one_order(order_id: int, db: Session = Depends(get_db)):
+    response = await run(db, orders.delete, order_id=order_id)
+    if response is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    return orders.delete(db=db, order_id=order_id)
+    return response
 
 
 # Sandwiches endpoints
 @app.post("/sandwiches/", response_model=schemas.Sandwich, tags=["Sandwiches"])
-def create_sandwich(sandwich: schemas.SandwichCreate, db: Session = Depends(get_db)):
-    return sandwiches.create(db=db, sandwich=sandwich)
+async def create_sandwich(sandwich: schemas.SandwichCreate, db: Session = Depends(get_db)):
+    return await run(db, sandwiches.create, sandwich=sandwich)
 
 
 @app.get("/sandwiches/", response_model=list[schemas.Sandwich], tags=["Sandwiches"])
-def read_sandwiches(db: Session = Depends(get_db)):
-    return sandwiches.read_all(db)
+async def read_sandwiches(request: Request, response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    if params.stream:
+        return ndjson_response(await stream_rows(db, sandwiches.stream_all, params=params), sandwiches.LISTING.response_schema(params))
+    rows = await run(db, sandwiches.read_all, params=params)
+    return list_response(request, response, rows, sandwiches.LISTING, params, conf.cache_control["sandwiches"])
+
+
+@app.post("/sandwiches/bulk", response_model=schemas.BulkResult, tags=["Sandwiches"])
+async def bulk_create_sandwiches(items: list[dict] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, sandwiches.bulk_create, items=items)
+
+
+@app.patch("/sandwiches/bulk", response_model=schemas.BulkResult, tags=["Sandwiches"])
+async def bulk_update_sandwiches(items: list[dict] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, sandwiches.bulk_update, items=items)
+
+
+@app.delete("/sandwiches/bulk", response_model=schemas.BulkResult, tags=["Sandwiches"])
+async def bulk_delete_sandwiches(ids: list[int] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, sandwiches.bulk_delete, ids=ids)
+
+
+@app.get("/sandwiches/availability", response_model=list[schemas.SandwichAvailability], tags=["Sandwiches"])
+async def read_sandwich_availability(db: Session = Depends(get_db)):
+    return await run(db, sandwiches.availability)
 
 
 @app.get("/sandwiches/{sandwich_id}", response_model=schemas.Sandwich, tags=["Sandwiches"])
-def read_one_sandwich(sandwich_id: int, db: Session = Depends(get_db)):
-    sandwich = sandwiches.read_one(db, sandwich_id=sandwich_id)
+async def read_one_sandwich(sandwich_id: int, db: Session = Depends(get_db)):
+    sandwich = await run(db, sandwiches.read_one, sandwich_id=sandwich_id)
     if sandwich is None:
         raise HTTPException(status_code=404, detail="Sandwich not found")
     return sandwich
 
 
 @app.put("/sandwiches/{sandwich_id}", response_model=schemas.Sandwich, tags=["Sandwiches"])
-def update_one_sandwich(sandwich_id: int, sandwich: schemas.SandwichUpdate, db: Session = Depends(get_db)):
-    sandwich_db = sandwiches.read_one(db, sandwich_id=sandwich_id)
+async def update_one_sandwich(sandwich_id: int, sandwich: schemas.SandwichUpdate, db: Session = Depends(get_db)):
+    sandwich_db = await run(db, sandwiches.update, sandwich=sandwich, sandwich_id=sandwich_id)
     if sandwich_db is None:
         raise HTTPException(status_code=404, detail="Sandwich not found")
-    return sandwiches.update(db=db, sandwich=sandwich, sandwich_id=sandwich_id)
+    return sandwich_db
 
 
 @app.delete("/sandwiches/{sandwich_id}", tags=["Sandwiches"])
-def delete_one_sandwich(sandwich_id: int, db: Session = Depends(get_db)):
-    sandwich = sandwiches.read_one(db, sandwich_id=sandwich_id)
-    if sandwich is None:
+async def delete_one_sandwich(sandwich_id: int, db: Session = Depends(get_db)):
+    response = await run(db, sandwiches.delete, sandwich_id=sandwich_id)
+    if response is None:
         raise HTTPException(status_code=404, detail="Sandwich not found")
-    return sandwiches.delete(db=db, sandwich_id=sandwich_id)
+    return response
 
 
 # Resources endpoints
 @app.post("/resources/", response_model=schemas.Resource, tags=["Resources"])
-def create_resource(resource: schemas.ResourceCreate, db: Session = Depends(get_db)):
-    return resources.create(db=db, resource=resource)
+async def create_resource(resource: schemas.ResourceCreate, db: Session = Depends(get_db)):
+    return await run(db, resources.create, resource=resource)
 
 
 @app.get("/resources/", response_model=list[schemas.Resource], tags=["Resources"])
-def read_resources(db: Session = Depends(get_db)):
-    return resources.read_all(db)
+async def read_resources(request: Request, response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    if params.stream:
+        return ndjson_response(await stream_rows(db, resources.stream_all, params=params), resources.LISTING.response_schema(params))
+    # Every resource write bumps its version, so ids and versions tag the page without loading it
+    etag, versions = await run(db, resources.versions, params=params)
+    set_next_cursor(response, versions)
+    cached = not_modified(request, response, etag, conf.cache_control["resources"])
+    if cached is not None:
+        return cached
+    rows = await run(db, resources.read_all, params=params)
+    return list_response(request, response, rows, resources.LISTING, params, conf.cache_control["resources"], etag)
+
+
+@app.post("/resources/bulk", response_model=schemas.BulkResult, tags=["Resources"])
+async def bulk_create_resources(items: list[dict] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, resources.bulk_create, items=items)
+
+
+@app.patch("/resources/bulk", response_model=schemas.BulkResult, tags=["Resources"])
+async def bulk_update_resources(items: list[dict] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, resources.bulk_update, items=items)
+
+
+@app.delete("/resources/bulk", response_model=schemas.BulkResult, tags=["Resources"])
+async def bulk_delete_resources(ids: list[int] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, resources.bulk_delete, ids=ids)
+
+
+# Server-Sent Events: "level" on every stock change, "low_stock" when one is below its threshold
+@app.get("/resources/events", tags=["Resources"])
+async def resource_events():
+    return event_stream_response(inventory_events)
 
 
 @app.get("/resources/{resource_id}", response_model=schemas.Resource, tags=["Resources"])
-def read_one_resource(resource_id: int, db: Session = Depends(get_db)):
-    resource = resources.read_one(db, resource_id=resource_id)
+async def read_one_resource(resource_id: int, response: Response, db: Session = Depends(get_db)):
+    resource = await run(db, resources.read_one, resource_id=resource_id)
     if resource is None:
         raise HTTPException(status_code=404, detail="Resource not found")
+    response.headers["ETag"] = version_etag(resource.version)
     return resource
 
 
 @app.put("/resources/{resource_id}", response_model=schemas.Resource, tags=["Resources"])
-def update_one_resource(resource_id: int, resource: schemas.ResourceUpdate, db: Session = Depends(get_db)):
-    resource_db = resources.read_one(db, resource_id=resource_id)
+async def update_one_resource(resource_id: int, resource: schemas.ResourceUpdate, response: Response, if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    resource_db = await run(db, resources.update, resource=resource, resource_id=resource_id, versions=if_match_versions(if_match))
     if resource_db is None:
         raise HTTPException(status_code=404, detail="Resource not found")
-    return resources.update(db=db, resource=resource, resource_id=resource_id)
+    response.headers["ETag"] = version_etag(resource_db.version)
+    return resource_db
+
+
+@app.patch("/resources/{resource_id}/adjust", response_model=schemas.Resource, tags=["Resources"])
+async def adjust_resource(resource_id: int, adjustment: schemas.ResourceAdjust, response: Response, db: Session = Depends(get_db)):
+    resource_db = await run(db, resources.adjust, resource_id=resource_id, delta=adjustment.delta)
+    if resource_db is None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    response.headers["ETag"] = version_etag(resource_db.version)
+    return resource_db
 
 
 @app.delete("/resources/{resource_id}", tags=["Resources"])
-def delete_one_resource(resource_id: int, db: Session = Depends(get_db)):
-    resource = resources.read_one(db, resource_id=resource_id)
-    if resource is None:
+async def delete_one_resource(resource_id: int, db: Session = Depends(get_db)):
+    response = await run(db, resources.delete, resource_id=resource_id)
+    if response is None:
         raise HTTPException(status_code=404, detail="Resource not found")
-    return resources.delete(db=db, resource_id=resource_id)
+    return response
 
 
 # Recipes endpoints
 @app.post("/recipes/", response_model=schemas.Recipe, tags=["Recipes"])
-def create_recipe(recipe: schemas.RecipeCreate, db: Session = Depends(get_db)):
-    return recipes.create(db=db, recipe=recipe)
+async def create_recipe(recipe: schemas.RecipeCreate, db: Session = Depends(get_db)):
+    return await run(db, recipes.create, recipe=recipe)
 
 
 @app.get("/recipes/", response_model=list[schemas.Recipe], tags=["Recipes"])
-def read_recipes(db: Session = Depends(get_db)):
-    return recipes.read_all(db)
+async def read_recipes(request: Request, response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    if params.stream:
+        return ndjson_response(await stream_rows(db, recipes.stream_all, params=params), recipes.LISTING.response_schema(params))
+    rows = await run(db, recipes.read_all, params=params)
+    return list_response(request, response, rows, recipes.LISTING, params)
+
+
+@app.post("/recipes/bulk", response_model=schemas.BulkResult, tags=["Recipes"])
+async def bulk_create_recipes(items: list[dict] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, recipes.bulk_create, items=items)
+
+
+@app.patch("/recipes/bulk", response_model=schemas.BulkResult, tags=["Recipes"])
+async def bulk_update_recipes(items: list[dict] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, recipes.bulk_update, items=items)
+
+
+@app.delete("/recipes/bulk", response_model=schemas.BulkResult, tags=["Recipes"])
+async def bulk_delete_recipes(ids: list[int] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, recipes.bulk_delete, ids=ids)
 
 
 @app.get("/recipes/{recipe_id}", response_model=schemas.Recipe, tags=["Recipes"])
-def read_one_recipe(recipe_id: int, db: Session = Depends(get_db)):
-    recipe = recipes.read_one(db, recipe_id=recipe_id)
+async def read_one_recipe(recipe_id: int, response: Response, db: Session = Depends(get_db)):
+    recipe = await run(db, recipes.read_one, recipe_id=recipe_id)
     if recipe is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
+    response.headers["ETag"] = version_etag(recipe.version)
     return recipe
 
 
 @app.put("/recipes/{recipe_id}", response_model=schemas.Recipe, tags=["Recipes"])
-def update_one_recipe(recipe_id: int, recipe: schemas.RecipeUpdate, db: Session = Depends(get_db)):
-    recipe_db = recipes.read_one(db, recipe_id=recipe_id)
+async def update_one_recipe(recipe_id: int, recipe: schemas.RecipeUpdate, response: Response, if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    recipe_db = await run(db, recipes.update, recipe=recipe, recipe_id=recipe_id, versions=if_match_versions(if_match))
     if recipe_db is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    return recipes.update(db=db, recipe=recipe, recipe_id=recipe_id)
+    response.headers["ETag"] = version_etag(recipe_db.version)
+    return recipe_db
 
 
 @app.delete("/recipes/{recipe_id}", tags=["Recipes"])
-def delete_one_recipe(recipe_id: int, db: Session = Depends(get_db)):
-    recipe = recipes.read_one(db, recipe_id=recipe_id)
-    if recipe is None:
+async def delete_one_recipe(recipe_id: int, db: Session = Depends(get_db)):
+    response = await run(db, recipes.delete, recipe_id=recipe_id)
+    if response is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    return recipes.delete(db=db, recipe_id=recipe_id)
+    return response
 
 
 # Order Details endpoints
 @app.post("/order_details/", response_model=schemas.OrderDetail, tags=["Order Details"])
-def create_order_detail(order_detail: schemas.OrderDetailCreate, db: Session = Depends(get_db)):
-    return order_details.create(db=db, order_detail=order_detail)
+async def create_order_detail(order_detail: schemas.OrderDetailCreate, idempotency_key: Optional[str] = Header(None, max_length=255), db: Session = Depends(get_db)):
+    if idempotency_key is None:
+        return await run(db, order_details.create, order_detail=order_detail)
+    return await run(
+        db, idempotency.create_once,
+        scope="order_details", key=idempotency_key, payload=order_detail, create=order_details.create, schema=schemas.OrderDetail,
+    )
 
 
 @app.get("/order_details/", response_model=list[schemas.OrderDetail], tags=["Order Details"])
-def read_order_details(db: Session = Depends(get_db)):
-    return order_details.read_all(db)
+async def read_order_details(request: Request, response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    if params.stream:
+        return ndjson_response(await stream_rows(db, order_details.stream_all, params=params), order_details.LISTING.response_schema(params))
+    if params.fields:
+        rows = await run(db, order_details.read_all, params=params)
+        return list_response(request, response, rows, order_details.LISTING, params)
+    return plain_response(response, await run(db, order_details.read_all_plain, params=params))
+
+
+@app.post("/order_details/bulk", response_model=schemas.BulkResult, tags=["Order Details"])
+async def bulk_create_order_details(items: list[dict] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, order_details.bulk_create, items=items)
+
+
+@app.patch("/order_details/bulk", response_model=schemas.BulkResult, tags=["Order Details"])
+async def bulk_update_order_details(items: list[dict] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, order_details.bulk_update, items=items)
+
+
+@app.delete("/order_details/bulk", response_model=schemas.BulkResult, tags=["Order Details"])
+async def bulk_delete_order_details(ids: list[int] = Body(...), db: Session = Depends(get_db)):
+    return await run(db, order_details.bulk_delete, ids=ids)
 
 
 @app.get("/order_details/{order_detail_id}", response_model=schemas.OrderDetail, tags=["Order Details"])
-def read_one_order_detail(order_detail_id: int, db: Session = Depends(get_db)):
-    od = order_details.read_one(db, order_detail_id=order_detail_id)
+async def read_one_order_detail(order_detail_id: int, db: Session = Depends(get_db)):
+    od = await run(db, order_details.read_one, order_detail_id=order_detail_id)
     if od is None:
         raise HTTPException(status_code=404, detail="Order detail not found")
     return od
 
 
 @app.put("/order_details/{order_detail_id}", response_model=schemas.OrderDetail, tags=["Order Details"])
-def update_one_order_detail(order_detail_id: int, order_detail: schemas.OrderDetailUpdate, db: Session = Depends(get_db)):
-    od = order_details.read_one(db, order_detail_id=order_detail_id)
+async def update_one_order_detail(order_detail_id: int, order_detail: schemas.OrderDetailUpdate, db: Session = Depends(get_db)):
+    od = await run(db, order_details.update, order_detail_id=order_detail_id, order_detail=order_detail)
     if od is None:
         raise HTTPException(status_code=404, detail="Order detail not found")
-    return order_details.update(db=db, order_detail_id=order_detail_id, order_detail=order_detail)
+    return od
 
 
 @app.delete("/order_details/{order_detail_id}", tags=["Order Details"])
-def delete_one_order_detail(order_detail_id: int, db: Session = Depends(get_db)):
-    od = order_details.read_one(db, order_detail_id=order_detail_id)
-    if od is None:
+async def delete_one_order_detail(order_detail_id: int, db: Session = Depends(get_db)):
+    response = await run(db, order_details.delete, order_detail_id=order_detail_id)
+    if response is None:
         raise HTTPException(status_code=404, detail="Order detail not found")
-    return order_details.delete(db=db, order_detail_id=order_detail_id)
+    return response
+
+
+# Reports endpoints
+@app.get("/reports/summary", response_model=schemas.SalesSummary, tags=["Reports"])
+async def read_sales_summary(start: Optional[datetime] = None, end: Optional[datetime] = None, db: Session = Depends(get_db)):
+    return await run(db, reports.summary, start=start, end=end)
+
+
+@app.get("/reports/sandwiches", response_model=list[schemas.SandwichSales], tags=["Reports"])
+async def read_sales_by_sandwich(start: Optional[datetime] = None, end: Optional[datetime] = None, db: Session = Depends(get_db)):
+    return await run(db, reports.by_sandwich, start=start, end=end)
+
+
+@app.get("/reports/periods", response_model=list[schemas.PeriodSales], tags=["Reports"])
+async def read_sales_by_period(bucket: Literal["day", "hour"] = "day", start: Optional[datetime] = None, end: Optional[datetime] = None, db: Session = Depends(get_db)):
+    return await run(db, reports.by_period, size=bucket, start=start, end=end)
+
+
+# Internal endpoints
+@app.get("/internal/pool", tags=["Internal"])
+async def read_pool_status():
+    status = pool_status(async_engine or engine)
+    if replica_engine is not None:
+        status["replica"] = pool_status(async_replica_engine or replica_engine)
+    return status
+
+
+@app.get("/internal/cache", tags=["Internal"])
+async def read_cache_status():
+    return cache.stats()
+
+
+@app.get("/metrics", tags=["Internal"])
+async def read_metrics():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
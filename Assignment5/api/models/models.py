@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, DECIMAL, DATETIME, UniqueConstraint
+from sqlalchemy import Column, ForeignKey, Integer, String, Text, DECIMAL, DATETIME, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -8,7 +8,7 @@ from ..dependencies.database import Base
 class Sandwich(Base):
     __tablename__ = "sandwiches"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     sandwich_name = Column(String(100), unique=True, nullable=False)
     price = Column(DECIMAL(4, 2), nullable=False, server_default='0.00')
 
@@ -18,10 +18,16 @@ class Sandwich(Base):
 
 class Resource(Base):
     __tablename__ = "resources"
+    # A new row never takes a deleted one's id, so ids and versions tag list pages (see Listing.versions)
+    __table_args__ = {"sqlite_autoincrement": True}
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     item = Column(String(100), unique=True, nullable=False)
-    amount = Column(Integer, index=True, nullable=False, server_default='0')
+    amount = Column(Integer, nullable=False, server_default='0')
+    # Alert subscribers when amount drops below this; NULL means never
+    low_stock_threshold = Column(Integer, nullable=True)
+    # Bumped by every write, so PUT with If-Match can refuse to overwrite a change it hasn't seen
+    version = Column(Integer, nullable=False, server_default='1')
 
     recipes = relationship("Recipe", back_populates="resource")
 
@@ -29,13 +35,16 @@ class Resource(Base):
 class Recipe(Base):
     __tablename__ = "recipes"
     __table_args__ = (
+        # Also serves lookups by sandwich_id, its leading column
         UniqueConstraint("sandwich_id", "resource_id", name="uq_recipe_sandwich_resource"),
+        Index("ix_recipes_resource_id", "resource_id"),
     )
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     sandwich_id = Column(Integer, ForeignKey("sandwiches.id"), nullable=False)
     resource_id = Column(Integer, ForeignKey("resources.id"), nullable=False)
-    amount = Column(Integer, index=True, nullable=False, server_default='0')
+    amount = Column(Integer, nullable=False, server_default='0')
+    version = Column(Integer, nullable=False, server_default='1')
 
     sandwich = relationship("Sandwich", back_populates="recipes")
     resource = relationship("Resource", back_populates="recipes")
@@ -43,22 +52,101 @@ class Recipe(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_customer_name_order_date", "customer_name", "order_date"),
+        # Never reuse ids on SQLite either, so reserved id blocks stay reserved (see orders.reserve_ids)
+        {"sqlite_autoincrement": True},
+    )
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     customer_name = Column(String(100))
-    order_date = Column(DATETIME, nullable=False, server_default=func.now())
+    # Stamped in Python so the stored value has the same format as the datetimes bound by filters,
+    # cursors and report bounds; SQLite compares them as text. The server default covers raw inserts.
+    order_date = Column(DATETIME, nullable=False, default=datetime.now, server_default=func.now(), index=True)
     description = Column(String(300))
 
-    order_details = relationship("OrderDetail", back_populates="order")
+    # A stable order keeps the response bytes, and so the ETag, the same between identical reads
+    order_details = relationship("OrderDetail", back_populates="order", order_by="OrderDetail.id")
 
 
 class OrderDetail(Base):
     __tablename__ = "order_details"
+    __table_args__ = (
+        # Covers the order -> detail -> sandwich join behind the sales reports and order loads
+        Index("ix_order_details_order_sandwich_amount", "order_id", "sandwich_id", "amount"),
+        Index("ix_order_details_sandwich_id", "sandwich_id"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
     sandwich_id = Column(Integer, ForeignKey("sandwiches.id"), nullable=False)
-    amount = Column(Integer, index=True, nullable=False)
+    amount = Column(Integer, nullable=False)
 
     sandwich = relationship("Sandwich", back_populates="order_details")
     order = relationship("Order", back_populates="order_details")
+
+
+class ArchivedOrder(Base):
+    """An order moved out of the hot tables by the archive job; same columns, same ids."""
+    __tablename__ = "archived_orders"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    customer_name = Column(String(100))
+    order_date = Column(DATETIME, nullable=False, index=True)
+    description = Column(String(300))
+
+    order_details = relationship("ArchivedOrderDetail", back_populates="order", order_by="ArchivedOrderDetail.id")
+
+
+class ArchivedOrderDetail(Base):
+    __tablename__ = "archived_order_details"
+    __table_args__ = (
+        Index("ix_archived_order_details_order_id", "order_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_id = Column(Integer, ForeignKey("archived_orders.id"), nullable=False)
+    sandwich_id = Column(Integer, ForeignKey("sandwiches.id"), nullable=False)
+    amount = Column(Integer, nullable=False)
+
+    sandwich = relationship("Sandwich")
+    order = relationship("ArchivedOrder", back_populates="order_details")
+
+
+class OrderRollup(Base):
+    """Hourly sales totals of archived orders, so reports still cover them."""
+    __tablename__ = "order_rollups"
+
+    # Start of the hour the orders were placed
+    hour = Column(DATETIME, primary_key=True)
+    orders = Column(Integer, nullable=False)
+    units = Column(Integer, nullable=False)
+    # Priced when the orders were archived
+    revenue = Column(DECIMAL(12, 2), nullable=False)
+
+
+class SandwichRollup(Base):
+    """Hourly sales of each sandwich in archived orders, for the per-sandwich report."""
+    __tablename__ = "sandwich_rollups"
+
+    hour = Column(DATETIME, primary_key=True)
+    sandwich_id = Column(Integer, ForeignKey("sandwiches.id"), primary_key=True)
+    orders = Column(Integer, nullable=False)
+    units = Column(Integer, nullable=False)
+    revenue = Column(DECIMAL(12, 2), nullable=False)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
+
+    # The route the key was used on, so one key can't replay another route's response
+    scope = Column(String(50), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    # Both NULL while the first request is still running
+    status_code = Column(Integer)
+    response_body = Column(Text)
+    created_at = Column(DATETIME, nullable=False)
@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
+from typing import Any, Optional
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class SandwichBase(BaseModel):
@@ -18,15 +18,21 @@ class SandwichUpdate(BaseModel):
 
 
 class Sandwich(SandwichBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
 
-    class ConfigDict:
-        from_attributes = True
+
+class SandwichAvailability(BaseModel):
+    id: int
+    sandwich_name: str
+    available: Optional[int] = None
 
 
 class ResourceBase(BaseModel):
     item: str
     amount: int
+    low_stock_threshold: Optional[int] = None
 
 
 class ResourceCreate(ResourceBase):
@@ -36,13 +42,18 @@ class ResourceCreate(ResourceBase):
 class ResourceUpdate(BaseModel):
     item: Optional[str] = None
     amount: Optional[int] = None
+    low_stock_threshold: Optional[int] = None
+
+
+class ResourceAdjust(BaseModel):
+    delta: int
 
 
 class Resource(ResourceBase):
-    id: int
+    model_config = ConfigDict(from_attributes=True)
 
-    class ConfigDict:
-        from_attributes = True
+    id: int
+    version: int = 1
 
 
 class RecipeBase(BaseModel):
@@ -59,13 +70,13 @@ class RecipeUpdate(BaseModel):
     amount: Optional[int] = None
 
 class Recipe(RecipeBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
+    version: int = 1
     sandwich: Sandwich = None
     resource: Resource = None
 
-    class ConfigDict:
-        from_attributes = True
-
 
 class OrderDetailBase(BaseModel):
     amount: int
@@ -82,21 +93,33 @@ class OrderDetailUpdate(BaseModel):
 
 
 class OrderDetail(OrderDetailBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     order_id: int
     sandwich: Sandwich = None
 
-    class ConfigDict:
-        from_attributes = True
-
 
 class OrderBase(BaseModel):
     customer_name: str
     description: Optional[str] = None
 
 
+class OrderLine(OrderDetailBase):
+    sandwich_id: int
+
+
 class OrderCreate(OrderBase):
-    pass
+    details: list[OrderLine] = []
+
+
+class OrderItem(BaseModel):
+    sandwich_id: int
+    quantity: int = Field(gt=0)
+
+
+class OrderPlace(OrderBase):
+    items: list[OrderItem] = Field(min_length=1)
 
 
 class OrderUpdate(BaseModel):
@@ -105,9 +128,48 @@ class OrderUpdate(BaseModel):
 
 
 class Order(OrderBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     order_date: Optional[datetime] = None
     order_details: list[OrderDetail] = None
 
-    class ConfigDict:
-        from_attributes = True
+
+class OrderIngestStatus(BaseModel):
+    id: int
+    status: str
+    status_url: str
+    error: Optional[Any] = None
+
+
+class BulkUpdateItem(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: int
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[Any] = None
+
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: list[BulkItemResult]
+
+
+class SalesSummary(BaseModel):
+    orders: int
+    units: int
+    revenue: float
+
+
+class SandwichSales(SalesSummary):
+    sandwich_id: int
+    sandwich_name: str
+
+
+class PeriodSales(SalesSummary):
+    period: datetime
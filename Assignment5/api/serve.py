@@ -0,0 +1,51 @@
+"""Run the API for production: several worker processes sharing one socket.
+
+Run from Assignment5/ after `python -m api.migrate`:
+
+    python -m api.serve                         # WEB_CONCURRENCY workers on port 8000
+    python -m api.serve --workers 4 --port 8080
+
+Each worker opens its connection pool and fills the menu and recipe caches before it
+takes traffic. On SIGTERM the workers stop accepting connections, give in-flight
+requests up to GRACEFUL_TIMEOUT seconds, then drain the order ingest queue and close
+their pools.
+"""
+import argparse
+import os
+
+import uvicorn
+
+from .dependencies.config import conf
+
+
+def parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=conf.workers)
+    parser.add_argument("--graceful-timeout", type=int, default=conf.graceful_timeout)
+    parser.add_argument("--no-prewarm", dest="prewarm", action="store_false", help="skip opening pools and filling caches at startup")
+    return parser
+
+
+def options(args):
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+        "lifespan": "on",
+        "access_log": False,
+    }
+
+
+def main():
+    args = parser().parse_args()
+    # A single worker runs in this process; more are fresh processes that read the environment
+    conf.prewarm_enabled = args.prewarm
+    os.environ["PREWARM_ENABLED"] = "1" if args.prewarm else "0"
+    uvicorn.run("api.main:app", **options(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from ..main import app
+from ..models import models
+from ..dependencies.database import get_db, async_url
+from ..dependencies.cache import cache, MemoryBackend
+from ..dependencies.config import conf
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    # Every test gets its own database, so cached reads must not leak between them
+    cache.backend = MemoryBackend(conf.cache_max_entries)
+
+
+@pytest.fixture
+def sqlite_engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    models.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def statements(sqlite_engine):
+    """Every SQL statement sent through the test engine, in order."""
+    recorded = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+
+    event.listen(sqlite_engine, "before_cursor_execute", before_cursor_execute)
+    yield recorded
+    event.remove(sqlite_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'file.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+
+    # SQLite only locks rows by locking the database; take the write lock up front
+    @event.listens_for(engine, "connect")
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    models.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def sqlite_db(sqlite_engine):
+    db = sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def serve_sessions(TestingSession):
+    """Give each request its own session from TestingSession."""
+    def override_get_db():
+        db = TestingSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+
+
+@pytest.fixture
+def sqlite_client(sqlite_engine):
+    serve_sessions(sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine))
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def file_sessions(file_engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=file_engine)
+
+
+@pytest.fixture
+def file_client(file_sessions):
+    """A client on the file database, where concurrent requests really contend for locks.
+
+    Enter it (`with file_client as client:`) for a lifespan; it can be entered again to restart.
+    """
+    serve_sessions(file_sessions)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def async_client(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    async_engine = create_async_engine(async_url(url))
+    TestingSession = async_sessionmaker(async_engine, autoflush=False)
+
+    async def override_get_db():
+        async with TestingSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.clear()
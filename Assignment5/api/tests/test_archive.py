@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+
+from ..controllers import archive
+from ..models import models
+
+
+@pytest.fixture
+def history(sqlite_db):
+    ham = models.Sandwich(sandwich_name="Ham", price=5)
+    club = models.Sandwich(sandwich_name="Club", price=7.5)
+    orders = [
+        models.Order(id=1, customer_name="A", order_date=datetime(2023, 5, 1, 11, 15)),
+        models.Order(id=2, customer_name="B", order_date=datetime(2024, 5, 1, 11, 45)),
+        models.Order(id=3, customer_name="C", order_date=datetime(2023, 5, 1, 12, 5)),
+        models.Order(id=4, customer_name="D", order_date=datetime(2024, 5, 2, 9, 0)),
+        models.Order(id=5, customer_name="E", order_date=datetime(2023, 5, 1, 11, 40)),
+    ]
+    sqlite_db.add_all([
+        ham, club, *orders,
+        models.OrderDetail(order=orders[0], sandwich=ham, amount=2),
+        models.OrderDetail(order=orders[0], sandwich=club, amount=1),
+        models.OrderDetail(order=orders[1], sandwich=ham, amount=1),
+        models.OrderDetail(order=orders[2], sandwich=club, amount=4),
+        models.OrderDetail(order=orders[4], sandwich=ham, amount=1),
+    ])
+    sqlite_db.commit()
+
+
+REPORTS = [
+    ("/reports/summary", {}),
+    ("/reports/sandwiches", {}),
+    ("/reports/periods", {"bucket": "day"}),
+    ("/reports/periods", {"bucket": "hour"}),
+    ("/reports/summary", {"start": "2023-05-01T12:00:00", "end": "2023-05-02T00:00:00"}),
+]
+
+
+def test_archive_moves_old_orders_and_keeps_report_totals(sqlite_client, sqlite_db, history):
+    reports = [sqlite_client.get(path, params=params).json() for path, params in REPORTS]
+
+    # Two batches, the second one adding to an hour the first already rolled up
+    assert archive.archive(sqlite_db, datetime(2024, 1, 1), batch_size=2) == 3
+
+    assert [o.customer_name for o in sqlite_db.query(models.Order)] == ["B", "D"]
+    assert [o.customer_name for o in sqlite_db.query(models.ArchivedOrder)] == ["A", "C", "E"]
+    assert sqlite_db.query(models.OrderDetail).count() == 1
+    assert sqlite_db.query(models.ArchivedOrderDetail).count() == 4
+    assert [(r.hour, r.orders, r.units, float(r.revenue)) for r in sqlite_db.query(models.OrderRollup)] == [
+        (datetime(2023, 5, 1, 11), 2, 4, 22.5),
+        (datetime(2023, 5, 1, 12), 1, 4, 30.0),
+    ]
+    names = {s.id: s.sandwich_name for s in sqlite_db.query(models.Sandwich)}
+    rollups = sqlite_db.query(models.SandwichRollup).order_by(models.SandwichRollup.hour, models.SandwichRollup.sandwich_id)
+    assert [(r.hour.hour, names[r.sandwich_id], r.orders, r.units, float(r.revenue)) for r in rollups] == [
+        (11, "Ham", 2, 3, 15.0),
+        (11, "Club", 1, 1, 7.5),
+        (12, "Club", 1, 4, 30.0),
+    ]
+    assert [sqlite_client.get(path, params=params).json() for path, params in REPORTS] == reports
+    assert archive.archive(sqlite_db, datetime(2024, 1, 1)) == 0
+
+
+def test_orders_listing_serves_hot_orders_unless_archived_are_asked_for(sqlite_client, sqlite_db, history):
+    archive.archive(sqlite_db, datetime(2024, 1, 1))
+
+    assert [o["customer_name"] for o in sqlite_client.get("/orders/").json()] == ["B", "D"]
+
+    first = sqlite_client.get("/orders/", params={"include_archived": "true", "limit": 3})
+    assert [o["customer_name"] for o in first.json()] == ["A", "B", "C"]
+    assert [d["amount"] for d in first.json()[0]["order_details"]] == [2, 1]
+    rest = sqlite_client.get("/orders/", params={"include_archived": "true", "limit": 3, "after": first.headers["X-Next-After"]})
+    assert [o["customer_name"] for o in rest.json()] == ["D", "E"]
+
+    newest = sqlite_client.get("/orders/", params={"include_archived": "true", "sort": "-order_date", "limit": 2})
+    assert [o["customer_name"] for o in newest.json()] == ["D", "B"]
+    older = sqlite_client.get("/orders/", params={
+        "include_archived": "true", "sort": "-order_date", "limit": 2, "cursor": newest.headers["X-Next-Cursor"],
+    })
+    assert [o["customer_name"] for o in older.json()] == ["C", "E"]
+
+    assert sqlite_client.get("/orders/", params={"include_archived": "true", "stream": "true"}).status_code == 422
+
@@ -0,0 +1,30 @@
+import json
+
+
+def test_routes_run_on_async_session(async_client):
+    sandwich = async_client.post("/sandwiches/", json={"sandwich_name": "Ham", "price": 5.5}).json()
+    bread = async_client.post("/resources/", json={"item": "Bread", "amount": 10}).json()
+    recipe = async_client.post("/recipes/", json={
+        "sandwich_id": sandwich["id"], "resource_id": bread["id"], "amount": 2,
+    })
+    assert recipe.status_code == 200
+    assert recipe.json()["resource"]["item"] == "Bread"
+
+    placed = async_client.post("/orders/place", json={
+        "customer_name": "Jane",
+        "items": [{"sandwich_id": sandwich["id"], "quantity": 3}],
+    })
+    assert placed.status_code == 200
+    assert placed.json()["order_details"][0]["sandwich"]["sandwich_name"] == "Ham"
+    assert async_client.get(f"/resources/{bread['id']}").json()["amount"] == 4
+
+    updated = async_client.put(f"/orders/{placed.json()['id']}", json={"description": "No mayo"})
+    assert updated.json()["description"] == "No mayo"
+    assert len(updated.json()["order_details"]) == 1
+
+    streamed = async_client.get("/orders/", params={"stream": True})
+    assert [json.loads(line)["customer_name"] for line in streamed.text.splitlines()] == ["Jane"]
+
+    # Sparse fieldsets stream plain rows rather than entities
+    partial = async_client.get("/resources/", params={"stream": True, "fields": "item", "amount_lt": 5})
+    assert [json.loads(line) for line in partial.text.splitlines()] == [{"item": "Bread"}]
@@ -0,0 +1,19 @@
+def test_availability_is_min_over_recipe_lines(sqlite_client, statements):
+    for name in ("Ham", "Club", "Water"):
+        sqlite_client.post("/sandwiches/", json={"sandwich_name": name, "price": 5})
+    sqlite_client.post("/resources/", json={"item": "Bread", "amount": 10})
+    sqlite_client.post("/resources/", json={"item": "Ham", "amount": 3})
+    for sandwich_id, resource_id, amount in ((1, 1, 2), (1, 2, 1), (2, 1, 3)):
+        sqlite_client.post("/recipes/", json={"sandwich_id": sandwich_id, "resource_id": resource_id, "amount": amount})
+
+    statements.clear()
+    response = sqlite_client.get("/sandwiches/availability")
+    assert len(statements) == 1
+    assert [(s["sandwich_name"], s["available"]) for s in response.json()] == [
+        ("Ham", 3),
+        ("Club", 3),
+        ("Water", None),
+    ]
+
+    sqlite_client.post("/orders/place", json={"customer_name": "Jane", "items": [{"sandwich_id": 1, "quantity": 3}]})
+    assert [s["available"] for s in sqlite_client.get("/sandwiches/availability").json()] == [0, 1, None]
@@ -0,0 +1,19 @@
+from benchmarks import load
+
+
+def test_load_benchmark_covers_every_route():
+    assert load.uncovered_routes() == set()
+
+
+def test_load_benchmark_smoke(tmp_path):
+    args = load.parser().parse_args([
+        "--url", f"sqlite:///{tmp_path / 'bench.db'}",
+        "--sandwiches", "5", "--resources", "10", "--orders", "20", "--order-details", "50",
+        "--requests", "4", "--concurrency", "2", "--bulk-size", "2",
+    ])
+    results = load.run(args)
+
+    assert results["meta"]["dialect"] == "sqlite"
+    assert len(results["endpoints"]) == len(load.SCENARIOS)
+    assert {name: r["errors"] for name, r in results["endpoints"].items() if r["errors"]} == {}
+    assert all(r["p50_ms"] <= r["p95_ms"] <= r["p99_ms"] for r in results["endpoints"].values())
@@ -0,0 +1,82 @@
+import asyncio
+
+from ..dependencies.events import inventory_events
+from ..models import models
+
+
+def test_bulk_create_reports_errors_per_item(sqlite_client, sqlite_db):
+    response = sqlite_client.post("/sandwiches/bulk", json=[
+        {"sandwich_name": "Ham", "price": 5},
+        {"sandwich_name": "Turkey"},
+        {"sandwich_name": "Club", "price": 7},
+        {"sandwich_name": "Ham", "price": 6},
+    ])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (2, 2)
+    results = body["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[0]["id"] is not None and results[2]["id"] is not None
+    assert results[1]["error"][0]["loc"] == ["price"]
+    assert "UNIQUE" in results[3]["error"]
+    assert sorted(s.sandwich_name for s in sqlite_db.query(models.Sandwich)) == ["Club", "Ham"]
+
+
+def test_bulk_create_returns_ids_without_executemany_returning(sqlite_client, sqlite_db, sqlite_engine, monkeypatch):
+    # As on MySQL, where an executemany can't hand back the ids it inserted
+    monkeypatch.setattr(sqlite_engine.dialect, "insert_executemany_returning", False)
+    sqlite_db.add(models.Resource(item="Bread", amount=1))
+    sqlite_db.commit()
+
+    async def scenario():
+        with inventory_events.subscribe() as subscription:
+            response = sqlite_client.post("/resources/bulk", json=[
+                {"item": "Ham", "amount": 3}, {"item": "Bread", "amount": 2}, {"item": "Cheese", "amount": 4},
+            ])
+            await asyncio.sleep(0)
+            events = []
+            while not subscription.queue.empty():
+                events.append(subscription.queue.get_nowait())
+            return response.json(), events
+
+    body, events = asyncio.run(scenario())
+    ids = {r.item: r.id for r in sqlite_db.query(models.Resource)}
+    assert [r["id"] for r in body["results"]] == [ids["Ham"], None, ids["Cheese"]]
+    assert "UNIQUE" in body["results"][1]["error"]
+    assert sorted(e["item"] for e in events) == ["Cheese", "Ham"]
+
+
+def test_bulk_create_without_returning_reads_ids_back_by_unique_key(sqlite_client, sqlite_db, sqlite_engine, statements, monkeypatch):
+    monkeypatch.setattr(sqlite_engine.dialect, "insert_executemany_returning", False)
+    statements.clear()
+
+    sandwiches = sqlite_client.post("/sandwiches/bulk", json=[{"sandwich_name": "Ham", "price": 5}, {"sandwich_name": "Club", "price": 7}]).json()
+    # One INSERT for the chunk and one SELECT for its ids, not a statement per row
+    assert [s.split()[0] for s in statements] == ["SAVEPOINT", "INSERT", "RELEASE", "SELECT"]
+    ids = {s.sandwich_name: s.id for s in sqlite_db.query(models.Sandwich)}
+    assert [r["id"] for r in sandwiches["results"]] == [ids["Ham"], ids["Club"]]
+
+    # Orders have no unique key to look ids up by, so they go in one row at a time
+    orders = sqlite_client.post("/orders/bulk", json=[{"customer_name": "Jane"}, {"customer_name": "John"}]).json()
+    assert [r["id"] for r in orders["results"]] == sorted(o.id for o in sqlite_db.query(models.Order))
+
+
+def test_bulk_update_and_delete(sqlite_client, sqlite_db):
+    sqlite_db.add_all([models.Resource(item="Bread", amount=1), models.Resource(item="Ham", amount=1)])
+    sqlite_db.commit()
+
+    updated = sqlite_client.patch("/resources/bulk", json=[
+        {"id": 1, "amount": 50},
+        {"id": 2, "amount": "lots"},
+        {"id": 99, "amount": 5},
+    ]).json()
+    assert (updated["succeeded"], updated["failed"]) == (1, 2)
+    assert updated["results"][2]["error"] == "Not found"
+
+    deleted = sqlite_client.request("DELETE", "/resources/bulk", json=[2, 42]).json()
+    assert (deleted["succeeded"], deleted["failed"]) == (1, 1)
+
+    sqlite_db.expire_all()
+    # The updated row moved to a new version, so an If-Match on the old one is refused
+    assert [(r.id, r.amount, r.version) for r in sqlite_db.query(models.Resource)] == [(1, 50, 2)]
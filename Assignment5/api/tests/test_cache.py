@@ -0,0 +1,58 @@
+from ..dependencies.cache import Cache, MemoryBackend, MISSING
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    assert backend.get("a") == 1
+    backend.set("c", 3, ttl=60)
+
+    assert backend.get("b") is MISSING
+    assert backend.get("a") == 1
+    assert backend.stats()["evictions"] == 1
+
+
+def test_memory_backend_expires_entries():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, ttl=-1)
+
+    assert backend.get("a") is MISSING
+    assert backend.stats()["expirations"] == 1
+
+
+def test_namespace_invalidation_drops_racing_loads():
+    namespace = Cache(MemoryBackend(max_entries=10)).namespace("menu")
+
+    def load_then_write():
+        # A write lands while this load is still running
+        namespace.invalidate()
+        return "stale"
+
+    assert namespace.get_or_load("all", load_then_write) == "stale"
+    assert namespace.get_or_load("all", lambda: "fresh") == "fresh"
+
+
+def test_menu_reads_hit_cache_until_a_write(sqlite_client, statements):
+    sqlite_client.post("/sandwiches/", json={"sandwich_name": "Ham", "price": 5})
+
+    statements.clear()
+    assert len(sqlite_client.get("/sandwiches/").json()) == 1
+    assert len(sqlite_client.get("/sandwiches/").json()) == 1
+    assert len(statements) == 1
+
+    sqlite_client.put("/sandwiches/1", json={"price": 6})
+    assert sqlite_client.get("/sandwiches/").json()[0]["price"] == 6
+
+    stats = sqlite_client.get("/internal/cache").json()
+    assert stats["hits"] >= 1
+
+
+def test_recipe_cache_sees_resource_changes(sqlite_client):
+    sqlite_client.post("/sandwiches/", json={"sandwich_name": "Ham", "price": 5})
+    sqlite_client.post("/resources/", json={"item": "Bread", "amount": 10})
+    sqlite_client.post("/recipes/", json={"sandwich_id": 1, "resource_id": 1, "amount": 2})
+    assert sqlite_client.get("/recipes/1").json()["resource"]["amount"] == 10
+
+    sqlite_client.post("/orders/place", json={"customer_name": "Jane", "items": [{"sandwich_id": 1, "quantity": 1}]})
+    assert sqlite_client.get("/recipes/1").json()["resource"]["amount"] == 8
@@ -0,0 +1,17 @@
+from ..dependencies.database import build_engine, pool_status
+
+
+def test_pool_status_reports_checkouts_and_waits(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=2, max_overflow=1)
+
+    with engine.connect(), engine.connect(), engine.connect():
+        status = pool_status(engine)
+        assert status["size"] == 2
+        assert status["checked_out"] == 3
+        assert status["overflow"] == 1
+
+    status = pool_status(engine)
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 3
+    assert status["timeouts"] == 0
+    engine.dispose()
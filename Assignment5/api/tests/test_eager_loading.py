@@ -0,0 +1,37 @@
+import pytest
+
+from ..dependencies.config import conf
+from ..models import models
+
+
+def seed(db, start, stop):
+    for i in range(start, stop):
+        sandwich = models.Sandwich(sandwich_name=f"Sandwich {i}", price=5)
+        resource = models.Resource(item=f"Resource {i}", amount=10)
+        order = models.Order(customer_name=f"Customer {i}")
+        db.add_all([
+            sandwich,
+            resource,
+            order,
+            models.Recipe(sandwich=sandwich, resource=resource, amount=1),
+            models.OrderDetail(order=order, sandwich=sandwich, amount=2),
+        ])
+    db.commit()
+
+
+@pytest.mark.parametrize("path", ["/orders/", "/recipes/", "/order_details/"])
+def test_listing_statement_count_is_independent_of_rows(sqlite_client, sqlite_db, statements, monkeypatch, path):
+    # Rows are seeded behind the controllers' backs, so measure the database, not the cache
+    monkeypatch.setattr(conf, "cache_enabled", False)
+    counts = []
+    seeded = 0
+    for rows in (1, 20):
+        seed(sqlite_db, seeded, rows)
+        seeded = rows
+        statements.clear()
+        response = sqlite_client.get(path)
+        assert response.status_code == 200
+        assert len(response.json()) == rows
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
@@ -0,0 +1,51 @@
+from datetime import datetime
+from decimal import Decimal
+
+from ..dependencies.http_cache import adapter
+from ..models import models, schemas
+
+
+def seed(db):
+    club = models.Sandwich(sandwich_name="Club", price=Decimal("7.50"))
+    croque = models.Sandwich(sandwich_name="Croque-monsieur à l'ancienne", price=Decimal("12.00"))
+    db.add_all([club, croque])
+    db.flush()
+    db.add_all([
+        models.Order(customer_name="Ann", description="No mayo", order_date=datetime(2024, 2, 1, 12, 30, 5, 123456), order_details=[
+            models.OrderDetail(sandwich_id=croque.id, amount=2),
+            models.OrderDetail(sandwich_id=club.id, amount=1),
+        ]),
+        # No details, no description
+        models.Order(customer_name="Bob", order_date=datetime(2024, 2, 2)),
+        models.Order(customer_name="Élodie \U0001f96a", description="\"quoted\"\n", order_date=datetime(2024, 2, 3), order_details=[
+            models.OrderDetail(sandwich_id=club.id, amount=3),
+        ]),
+    ])
+    db.commit()
+
+
+def response_model_bytes(rows, schema):
+    # What FastAPI produces for response_model=list[schema]
+    return adapter(list[schema]).dump_json(adapter(list[schema]).validate_python(rows, from_attributes=True))
+
+
+def test_fast_path_is_byte_compatible(sqlite_client, sqlite_db):
+    seed(sqlite_db)
+    for route, model, schema in (
+        ("/orders/", models.Order, schemas.Order),
+        ("/order_details/", models.OrderDetail, schemas.OrderDetail),
+    ):
+        expected = response_model_bytes(sqlite_db.query(model).order_by(model.id).all(), schema)
+        assert sqlite_client.get(route).content == expected
+
+
+def test_fast_path_keeps_cursors_and_filters(sqlite_client, sqlite_db):
+    seed(sqlite_db)
+
+    page = sqlite_client.get("/orders/", params={"limit": 1, "sort": "-order_date"})
+    assert [o["customer_name"] for o in page.json()] == ["Élodie \U0001f96a"]
+    assert "X-Next-Cursor" in page.headers
+
+    details = sqlite_client.get("/order_details/", params={"amount_gte": 2})
+    assert [(d["amount"], d["sandwich"]["price"]) for d in details.json()] == [(2, 12.0), (3, 7.5)]
+
@@ -0,0 +1,86 @@
+from ..dependencies import http_cache
+
+
+def test_unchanged_list_revalidates_with_304(sqlite_client):
+    sqlite_client.post("/sandwiches/", json={"sandwich_name": "Ham", "price": 5})
+
+    first = sqlite_client.get("/sandwiches/")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "public, max-age=30"
+    assert first.json() == [{"sandwich_name": "Ham", "price": 5.0, "id": 1}]
+
+    cached = sqlite_client.get("/sandwiches/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+    sqlite_client.put("/sandwiches/1", json={"price": 6})
+    changed = sqlite_client.get("/sandwiches/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_cached_list_is_serialized_once(sqlite_client, monkeypatch):
+    sqlite_client.post("/sandwiches/", json={"sandwich_name": "Ham", "price": 5})
+    encoded = []
+    adapter = http_cache.adapter
+    monkeypatch.setattr(http_cache, "adapter", lambda response_type: encoded.append(response_type) or adapter(response_type))
+
+    first = sqlite_client.get("/sandwiches/")
+    assert encoded
+    encoded.clear()
+    again = sqlite_client.get("/sandwiches/")
+    revalidated = sqlite_client.get("/sandwiches/", headers={"If-None-Match": first.headers["ETag"]})
+    assert (again.content, again.headers["ETag"]) == (first.content, first.headers["ETag"])
+    assert revalidated.status_code == 304
+    assert encoded == []
+
+
+def test_resource_list_revalidates_from_row_versions(sqlite_client, statements, monkeypatch):
+    for item in ("Bread", "Ham"):
+        sqlite_client.post("/resources/", json={"item": item, "amount": 1})
+    first = sqlite_client.get("/resources/")
+    etag = first.headers["ETag"]
+
+    encoded = []
+    adapter = http_cache.adapter
+    monkeypatch.setattr(http_cache, "adapter", lambda response_type: encoded.append(response_type) or adapter(response_type))
+    statements.clear()
+    assert sqlite_client.get("/resources/", headers={"If-None-Match": etag}).status_code == 304
+    # Only ids and versions were read, and nothing was serialized
+    assert len(statements) == 1
+    assert "resources.item" not in statements[0]
+    assert encoded == []
+
+    sqlite_client.put("/resources/2", json={"amount": 5})
+    changed = sqlite_client.get("/resources/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()[1]["amount"] == 5
+
+    # A recreated row never takes the deleted one's id and version, so it can't pass for the old page
+    sqlite_client.post("/resources/", json={"item": "Cheese", "amount": 1})
+    etag = sqlite_client.get("/resources/").headers["ETag"]
+    sqlite_client.delete("/resources/3")
+    sqlite_client.post("/resources/", json={"item": "Cheese", "amount": 9})
+    assert sqlite_client.get("/resources/", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_etag_keeps_pagination_cursor(sqlite_client):
+    for item in ("Bread", "Ham"):
+        sqlite_client.post("/resources/", json={"item": item, "amount": 1})
+
+    page = sqlite_client.get("/resources/", params={"limit": 1})
+    assert page.headers["X-Next-After"] == "1"
+
+    revalidated = sqlite_client.get("/resources/", params={"limit": 1}, headers={"If-None-Match": f'W/{page.headers["ETag"]}'})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["X-Next-After"] == "1"
+
+
+def test_single_order_etag(sqlite_client):
+    order = sqlite_client.post("/orders/", json={"customer_name": "Jane"}).json()
+
+    first = sqlite_client.get(f"/orders/{order['id']}")
+    assert first.json() == order
+    assert sqlite_client.get(f"/orders/{order['id']}", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert sqlite_client.get("/orders/99", headers={"If-None-Match": "*"}).status_code == 404
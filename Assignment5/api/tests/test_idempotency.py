@@ -0,0 +1,114 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from ..controllers import idempotency, orders
+from ..models import models, schemas
+
+
+def test_retry_replays_the_stored_response(sqlite_client, sqlite_db, statements):
+    headers = {"Idempotency-Key": "retry-1"}
+    first = sqlite_client.post("/orders/", json={"customer_name": "Jane"}, headers=headers)
+    assert first.status_code == 200
+
+    statements.clear()
+    retry = sqlite_client.post("/orders/", json={"customer_name": "Jane"}, headers=headers)
+    assert retry.content == first.content
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    # The replay only touched the key table
+    assert all("idempotency_keys" in s for s in statements)
+    assert sqlite_db.query(models.Order).count() == 1
+
+
+def test_keys_are_scoped_and_bound_to_the_request(sqlite_client, sqlite_db):
+    headers = {"Idempotency-Key": "shared"}
+    order = sqlite_client.post("/orders/", json={"customer_name": "Jane"}, headers=headers).json()
+    sandwich = sqlite_client.post("/sandwiches/", json={"sandwich_name": "Club", "price": 5}).json()
+
+    # Same key on another route is a different key
+    detail = sqlite_client.post("/order_details/", json={
+        "order_id": order["id"], "sandwich_id": sandwich["id"], "amount": 1,
+    }, headers=headers)
+    assert detail.status_code == 200
+    assert "Idempotent-Replayed" not in detail.headers
+
+    changed = sqlite_client.post("/orders/", json={"customer_name": "John"}, headers=headers)
+    assert changed.status_code == 422
+
+
+def test_failed_create_releases_the_key(sqlite_client, sqlite_db):
+    headers = {"Idempotency-Key": "bad-refs"}
+    body = {"order_id": 1, "sandwich_id": 1, "amount": 1}
+    assert sqlite_client.post("/order_details/", json=body, headers=headers).status_code == 404
+
+    sqlite_db.add_all([models.Order(customer_name="Jane"), models.Sandwich(sandwich_name="Club", price=5)])
+    sqlite_db.commit()
+    assert sqlite_client.post("/order_details/", json=body, headers=headers).status_code == 200
+
+
+def test_expired_keys_can_be_reused(sqlite_client, sqlite_db):
+    headers = {"Idempotency-Key": "old"}
+    sqlite_client.post("/orders/", json={"customer_name": "Jane"}, headers=headers)
+    sqlite_db.query(models.IdempotencyKey).update({"created_at": idempotency.now() - timedelta(days=2)})
+    sqlite_db.commit()
+
+    again = sqlite_client.post("/orders/", json={"customer_name": "Jane"}, headers=headers)
+    assert "Idempotent-Replayed" not in again.headers
+    assert sqlite_db.query(models.Order).count() == 2
+
+
+def test_abandoned_claims_are_taken_over_after_the_lease(sqlite_client, sqlite_db):
+    headers = {"Idempotency-Key": "crashed"}
+    # A claim whose request died before it stored a response
+    request_hash = hashlib.sha256(schemas.OrderCreate(customer_name="Jane").model_dump_json().encode()).hexdigest()
+    sqlite_db.add(models.IdempotencyKey(scope="orders", key="crashed", request_hash=request_hash, created_at=idempotency.now()))
+    sqlite_db.commit()
+    assert sqlite_client.post("/orders/", json={"customer_name": "Jane"}, headers=headers).status_code == 409
+
+    sqlite_db.query(models.IdempotencyKey).update({"created_at": idempotency.now() - timedelta(minutes=5)})
+    sqlite_db.commit()
+    retry = sqlite_client.post("/orders/", json={"customer_name": "Jane"}, headers=headers)
+    assert retry.status_code == 200
+    assert "Idempotent-Replayed" not in retry.headers
+    assert sqlite_db.query(models.Order).count() == 1
+
+
+def test_request_that_lost_its_key_to_a_retry_rolls_back(sqlite_db):
+    order = schemas.OrderCreate(customer_name="Jane")
+
+    def slow_create(db, payload, commit=True):
+        # Meanwhile the lease runs out and a retry takes the key over
+        db.query(models.IdempotencyKey).update({"created_at": idempotency.now() - timedelta(minutes=5)})
+        db.commit()
+        existing, retry_claimed_at = idempotency.claim(db, "orders", "slow", "retry")
+        assert existing is None
+        slow_create.retry_claimed_at = retry_claimed_at
+        return orders.create(db, payload, commit=commit)
+
+    with pytest.raises(HTTPException) as lost:
+        idempotency.create_once(sqlite_db, "orders", "slow", order, slow_create, schemas.Order)
+
+    assert lost.value.status_code == 409
+    assert sqlite_db.query(models.Order).count() == 0
+    # The retry's claim is left alone for it to finish
+    key = sqlite_db.query(models.IdempotencyKey).one()
+    assert (key.created_at, key.request_hash, key.status_code) == (slow_create.retry_claimed_at, "retry", None)
+
+
+def test_concurrent_duplicates_create_one_row(file_client, file_sessions):
+    with file_client as client:
+        def create(_):
+            response = client.post("/orders/", json={"customer_name": "Jane"}, headers={"Idempotency-Key": "race"})
+            return response.status_code, response.content
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(create, range(64)))
+
+    # Late duplicates replay the first response; ones that overlap it are told to retry
+    assert {code for code, _ in results} <= {200, 409}
+    assert len({content for code, content in results if code == 200}) == 1
+    with file_sessions() as db:
+        assert db.query(models.Order).count() == 1
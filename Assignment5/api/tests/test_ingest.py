@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from ..controllers import orders
+from ..models import models, schemas
+from ..dependencies import database
+from ..dependencies.config import conf
+from ..dependencies.ingest import OrderIngest, order_ingest
+
+
+@pytest.fixture
+def ingest_client(file_client, file_sessions, monkeypatch):
+    """file_client with ingestion enabled; each `with ingest_client as client:` is one server lifespan."""
+    monkeypatch.setattr(conf, "ingest_enabled", True)
+    monkeypatch.setattr(conf, "ingest_batch_ms", 5)
+    monkeypatch.setattr(conf, "ingest_id_block", 10)
+    monkeypatch.setattr(database, "SessionLocal", file_sessions)
+    return file_client
+
+
+def test_reserved_ids_are_never_handed_out_again(file_sessions):
+    with file_sessions() as db:
+        first = orders.reserve_ids(db, 5)
+        db.add(models.Order(customer_name="Walk-in"))
+        db.commit()
+        second = orders.reserve_ids(db, 5)
+        # The placeholders are gone, and the walk-in order took an id outside both blocks
+        assert [o.customer_name for o in db.query(models.Order)] == ["Walk-in"]
+        walk_in = db.query(models.Order).one().id
+
+    assert len(first) == len(second) == 5
+    assert not set(first) & set(second)
+    assert walk_in not in first + second
+
+
+def test_accepted_orders_are_committed_and_reported(ingest_client):
+    with ingest_client as client:
+        response = client.post("/orders/ingest", json={"customer_name": "Jane"})
+        assert response.status_code == 202
+        body = response.json()
+        assert body["status"] == "queued"
+        assert response.headers["Location"] == body["status_url"] == f"/orders/ingest/{body['id']}"
+
+        for _ in range(100):
+            status = client.get(body["status_url"]).json()
+            if status["status"] == "committed":
+                break
+            time.sleep(0.01)
+        assert status["status"] == "committed"
+        assert client.get(f"/orders/{body['id']}").json()["customer_name"] == "Jane"
+
+
+def test_queued_details_are_committed_with_their_order(ingest_client, file_sessions):
+    with file_sessions() as db:
+        db.add(models.Sandwich(sandwich_name="Ham", price=5))
+        db.commit()
+
+    with ingest_client as client:
+        good = client.post("/orders/ingest", json={"customer_name": "Jane", "details": [{"sandwich_id": 1, "amount": 2}]}).json()
+        bad = client.post("/orders/ingest", json={"customer_name": "John", "details": [{"sandwich_id": 99, "amount": 1}]}).json()
+
+    with ingest_client as client:
+        assert client.get(f"/orders/{good['id']}").json()["order_details"][0]["amount"] == 2
+        # A restart forgets the failure; all that's left to say is that it isn't committed
+        assert client.get(bad["status_url"]).json()["status"] == "unknown"
+
+
+def test_status_falls_back_to_the_database(ingest_client, file_sessions):
+    with file_sessions() as db:
+        db.add(models.Order(customer_name="Jane"))
+        db.commit()
+        order_id = db.query(models.Order).one().id
+
+    with ingest_client as client:
+        assert client.get(f"/orders/ingest/{order_id}").json()["status"] == "committed"
+        # Not committed, and this worker never saw it: another worker may still have it queued
+        unseen = client.get(f"/orders/ingest/{order_id + 1000}")
+        assert unseen.status_code == 200
+        assert unseen.json()["status"] == "unknown"
+
+
+def test_shutdown_commits_everything_accepted(ingest_client, file_sessions, monkeypatch):
+    # Long enough that nothing is written until the queue is drained on shutdown
+    monkeypatch.setattr(conf, "ingest_batch_ms", 60000)
+    with ingest_client as client:
+        ids = [client.post("/orders/ingest", json={"customer_name": f"Customer {n}"}).json()["id"] for n in range(25)]
+        with file_sessions() as db:
+            assert db.query(models.Order).count() == 0
+
+    with file_sessions() as db:
+        assert sorted(db.scalars(select(models.Order.id))) == sorted(ids)
+
+
+def test_full_queue_and_disabled_ingest_are_503(file_sessions, monkeypatch):
+    monkeypatch.setattr(conf, "ingest_queue_size", 2)
+    monkeypatch.setattr(conf, "ingest_batch_ms", 60000)
+    monkeypatch.setattr(conf, "ingest_batch_rows", 100)
+    order = schemas.OrderCreate(customer_name="Jane")
+
+    async def scenario():
+        ingest = OrderIngest()
+        with pytest.raises(HTTPException) as disabled:
+            await ingest.submit(order)
+        assert disabled.value.status_code == 503
+
+        ingest.start(file_sessions)
+        # The worker holds the first order while it waits for a batch, the queue holds two more
+        await ingest.submit(order)
+        await asyncio.sleep(0)
+        await ingest.submit(order)
+        await ingest.submit(order)
+        with pytest.raises(HTTPException) as full:
+            await ingest.submit(order)
+        assert full.value.status_code == 503
+        assert full.value.headers["Retry-After"] == "1"
+        ingest.worker.cancel()
+
+    asyncio.run(scenario())
+    assert order_ingest.worker is None
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+from ..controllers import orders, resources
+from ..dependencies.events import EventBus, inventory_events, server_sent_events
+from ..models import models, schemas
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_placing_an_order_publishes_levels_and_alerts(sqlite_db):
+    bread = models.Resource(item="Bread", amount=10, low_stock_threshold=5)
+    ham = models.Resource(item="Ham", amount=10)
+    sandwich = models.Sandwich(sandwich_name="Ham", price=5)
+    sqlite_db.add_all([bread, ham, sandwich])
+    sqlite_db.flush()
+    sqlite_db.add_all([
+        models.Recipe(sandwich_id=sandwich.id, resource_id=bread.id, amount=2),
+        models.Recipe(sandwich_id=sandwich.id, resource_id=ham.id, amount=1),
+    ])
+    sqlite_db.commit()
+
+    async def scenario():
+        with inventory_events.subscribe() as subscription:
+            orders.place(sqlite_db, schemas.OrderPlace(
+                customer_name="Jane", items=[{"sandwich_id": sandwich.id, "quantity": 3}],
+            ))
+            # Publishing hops onto the loop with call_soon_threadsafe
+            await asyncio.sleep(0)
+            return drain(subscription)
+
+    events = asyncio.run(scenario())
+    assert [(e["type"], e["item"], e["amount"]) for e in events] == [
+        ("level", "Bread", 4), ("low_stock", "Bread", 4), ("level", "Ham", 7),
+    ]
+    assert not inventory_events.has_subscribers()
+
+
+def test_resource_writes_publish_only_with_subscribers(sqlite_db, statements):
+    created = resources.create(sqlite_db, schemas.ResourceCreate(item="Cheese", amount=1))
+    assert not any("WHERE resources.id IN" in s for s in statements)
+
+    async def scenario():
+        with inventory_events.subscribe() as subscription:
+            resources.update(sqlite_db, created.id, schemas.ResourceUpdate(low_stock_threshold=2))
+            resources.delete(sqlite_db, created.id)
+            await asyncio.sleep(0)
+            return drain(subscription)
+
+    events = asyncio.run(scenario())
+    assert [e["type"] for e in events] == ["level", "low_stock", "deleted"]
+
+
+def test_slow_subscribers_drop_their_oldest_events():
+    bus = EventBus(max_events=2)
+
+    async def scenario():
+        with bus.subscribe() as subscription:
+            for n in range(5):
+                bus.publish({"type": "level", "n": n})
+            await asyncio.sleep(0)
+            return drain(subscription), subscription.dropped
+
+    events, dropped = asyncio.run(scenario())
+    assert [e["n"] for e in events] == [3, 4]
+    assert dropped == 3
+
+
+def test_server_sent_events_format():
+    bus = EventBus(max_events=10)
+
+    async def scenario():
+        stream = server_sent_events(bus, keepalive=0.01)
+        assert await anext(stream) == ": connected\n\n"
+        assert await anext(stream) == ": keepalive\n\n"
+        bus.publish({"type": "low_stock", "id": 1})
+        message = await anext(stream)
+        await stream.aclose()
+        return message
+
+    message = asyncio.run(scenario())
+    event, data = message.strip().split("\n")
+    assert event == "event: low_stock"
+    assert json.loads(data.removeprefix("data: ")) == {"type": "low_stock", "id": 1}
+    assert not bus.has_subscribers()
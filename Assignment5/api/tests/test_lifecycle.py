@@ -0,0 +1,49 @@
+from contextlib import asynccontextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from .. import main, serve
+from ..models import models
+from ..dependencies.cache import cache
+from ..dependencies.config import conf
+
+
+def test_prewarm_serves_the_first_menu_request_from_cache(sqlite_client, sqlite_engine, statements, monkeypatch):
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)
+    with TestingSession() as db:
+        db.add(models.Sandwich(sandwich_name="Ham", price=5))
+        db.commit()
+
+    @asynccontextmanager
+    async def primary_session():
+        with TestingSession() as db:
+            yield db
+
+    async def open_pools():
+        pass
+
+    monkeypatch.setattr(conf, "prewarm_enabled", True)
+    monkeypatch.setattr(main, "primary_session", primary_session)
+    monkeypatch.setattr(main, "open_pools", open_pools)
+
+    with TestClient(main.app) as client:
+        statements.clear()
+        hits = cache.stats()["hits"]
+        for path in ("/sandwiches/", "/sandwiches/availability", "/recipes/"):
+            assert client.get(path).status_code == 200
+        assert cache.stats()["hits"] == hits + 3
+        assert statements == []
+
+
+def test_serve_options():
+    args = serve.parser().parse_args(["--workers", "4", "--graceful-timeout", "10"])
+    assert serve.options(args) == {
+        "host": "0.0.0.0",
+        "port": 8000,
+        "workers": 4,
+        "timeout_graceful_shutdown": 10,
+        "lifespan": "on",
+        "access_log": False,
+    }
+    assert args.prewarm is True
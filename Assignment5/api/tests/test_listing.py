@@ -0,0 +1,107 @@
+import json
+from datetime import datetime
+
+from ..dependencies.listing import fields_schema
+from ..models import models
+
+
+def seed_resources(db):
+    db.add_all([
+        models.Resource(item="Bread", amount=40),
+        models.Resource(item="Cheese", amount=3),
+        models.Resource(item="Ham", amount=3),
+        models.Resource(item="Lettuce", amount=0),
+    ])
+    db.commit()
+
+
+def test_filters_with_operators(sqlite_client, sqlite_db):
+    seed_resources(sqlite_db)
+
+    low = sqlite_client.get("/resources/", params={"amount_lt": 5})
+    assert low.status_code == 200
+    assert [r["item"] for r in low.json()] == ["Cheese", "Ham", "Lettuce"]
+
+    exact = sqlite_client.get("/resources/", params={"item": "Ham"})
+    assert [r["item"] for r in exact.json()] == ["Ham"]
+
+
+def test_filter_by_date_range(sqlite_client, sqlite_db):
+    sqlite_db.add_all([
+        models.Order(customer_name="Ann", order_date=datetime(2024, 1, 1)),
+        models.Order(customer_name="Ann", order_date=datetime(2024, 2, 1)),
+        models.Order(customer_name="Bob", order_date=datetime(2024, 2, 2)),
+    ])
+    sqlite_db.commit()
+
+    response = sqlite_client.get("/orders/", params={"customer_name": "Ann", "order_date_gte": "2024-01-15"})
+    assert [o["order_date"] for o in response.json()] == ["2024-02-01T00:00:00"]
+
+
+def test_bad_filters_are_rejected(sqlite_client):
+    assert sqlite_client.get("/resources/", params={"amount_lt": "many"}).status_code == 422
+    assert sqlite_client.get("/resources/", params={"colour": "red"}).status_code == 422
+    assert sqlite_client.get("/resources/", params={"sort": "description"}).status_code == 422
+    assert sqlite_client.get("/resources/", params={"fields": "recipes"}).status_code == 422
+
+
+def test_sort_pages_with_opaque_cursor(sqlite_client, sqlite_db):
+    seed_resources(sqlite_db)
+
+    first = sqlite_client.get("/resources/", params={"sort": "-amount", "limit": 2})
+    assert [(r["item"], r["amount"]) for r in first.json()] == [("Bread", 40), ("Cheese", 3)]
+    assert "X-Next-After" not in first.headers
+
+    # Ties on amount continue by id, so Ham follows Cheese without repeating it
+    rest = sqlite_client.get("/resources/", params={"sort": "-amount", "limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert [r["item"] for r in rest.json()] == ["Ham", "Lettuce"]
+
+    assert sqlite_client.get("/resources/", params={"sort": "-amount", "after": 1}).status_code == 422
+    assert sqlite_client.get("/resources/", params={"sort": "-amount", "cursor": "garbage"}).status_code == 422
+
+
+def test_sort_by_order_date_pages_orders_created_through_the_api(sqlite_client):
+    created = [sqlite_client.post("/orders/", json={"customer_name": f"Customer {n}"}).json()["id"] for n in range(5)]
+
+    for sort, expected in (("order_date", created), ("-order_date", created[::-1])):
+        seen, params = [], {"sort": sort, "limit": 2}
+        while True:
+            page = sqlite_client.get("/orders/", params=params)
+            seen += [o["id"] for o in page.json()]
+            if "X-Next-Cursor" not in page.headers:
+                break
+            params["cursor"] = page.headers["X-Next-Cursor"]
+            assert len(seen) <= len(created)
+        assert seen == expected
+
+
+def test_sparse_fieldsets_select_only_those_columns(sqlite_client, sqlite_db, statements):
+    seed_resources(sqlite_db)
+    statements.clear()
+
+    response = sqlite_client.get("/resources/", params={"fields": "item", "amount_gt": 5})
+    assert response.status_code == 200
+    assert response.json() == [{"item": "Bread"}]
+    select = next(s for s in statements if s.lstrip().upper().startswith("SELECT"))
+    assert "resources.amount" not in select.split("FROM")[0]
+
+
+def test_spellings_of_the_same_fields_share_one_schema(sqlite_client, sqlite_db):
+    seed_resources(sqlite_db)
+    fields_schema.cache_clear()
+
+    bodies = {
+        sqlite_client.get("/resources/", params={"fields": spelling, "limit": 1}).text
+        for spelling in ("id,item", "item,id", "id,item,id,id", " item , id ,item")
+    }
+    assert bodies == {'[{"item":"Bread","id":1}]'}
+    assert fields_schema.cache_info().currsize == 1
+
+
+def test_sparse_fieldsets_stream(sqlite_client, sqlite_db):
+    seed_resources(sqlite_db)
+
+    response = sqlite_client.get("/resources/", params={"stream": True, "fields": "id,amount", "amount_lte": 3})
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"id": 2, "amount": 3}, {"id": 3, "amount": 3}, {"id": 4, "amount": 0},
+    ]
@@ -0,0 +1,30 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect
+
+from .. import migrate
+from ..models import models
+
+
+def test_migrations_build_the_model_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    migrate.upgrade(engine)
+
+    with engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), models.Base.metadata)
+    assert diff == []
+    engine.dispose()
+
+
+def test_legacy_create_all_database_is_stamped_then_upgraded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    migrate.upgrade(engine, migrate.BASELINE)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE alembic_version")
+
+    migrate.upgrade(engine)
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("order_details")}
+    assert "ix_order_details_sandwich_id" in indexes
+    assert "ix_order_details_amount" not in indexes
+    engine.dispose()
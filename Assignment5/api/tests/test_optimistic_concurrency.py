@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from ..models import models
+
+
+def test_put_with_stale_if_match_is_refused(sqlite_client):
+    created = sqlite_client.post("/resources/", json={"item": "Bread", "amount": 10}).json()
+    etag = sqlite_client.get(f"/resources/{created['id']}").headers["ETag"]
+    assert etag == '"1"'
+
+    first = sqlite_client.put(f"/resources/{created['id']}", json={"amount": 12}, headers={"If-Match": etag})
+    assert first.status_code == 200
+    assert first.headers["ETag"] == '"2"'
+
+    # A second manager still holding version 1 doesn't overwrite the first one's change
+    stale = sqlite_client.put(f"/resources/{created['id']}", json={"amount": 8}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert sqlite_client.get(f"/resources/{created['id']}").json()["amount"] == 12
+
+    assert sqlite_client.put(f"/resources/{created['id']}", json={"amount": 8}, headers={"If-Match": "*"}).status_code == 200
+    assert sqlite_client.put("/resources/99", json={"amount": 8}, headers={"If-Match": etag}).status_code == 404
+
+
+def test_recipe_put_checks_if_match(sqlite_client):
+    sandwich = sqlite_client.post("/sandwiches/", json={"sandwich_name": "Ham", "price": 5}).json()
+    resource = sqlite_client.post("/resources/", json={"item": "Bread", "amount": 10}).json()
+    recipe = sqlite_client.post("/recipes/", json={"sandwich_id": sandwich["id"], "resource_id": resource["id"], "amount": 2}).json()
+
+    etag = sqlite_client.get(f"/recipes/{recipe['id']}").headers["ETag"]
+    assert etag == '"1"'
+    updated = sqlite_client.put(f"/recipes/{recipe['id']}", json={"amount": 3}, headers={"If-Match": etag})
+    assert updated.json()["version"] == 2
+    assert updated.headers["ETag"] == '"2"'
+    assert sqlite_client.put(f"/recipes/{recipe['id']}", json={"amount": 4}, headers={"If-Match": etag}).status_code == 412
+    assert sqlite_client.put(f"/recipes/{recipe['id']}", json={}, headers={"If-Match": etag}).status_code == 412
+    current = sqlite_client.get(f"/recipes/{recipe['id']}")
+    assert (current.json()["amount"], current.headers["ETag"]) == (3, '"2"')
+
+
+def test_adjust_refuses_to_go_negative(sqlite_client):
+    created = sqlite_client.post("/resources/", json={"item": "Bread", "amount": 3}).json()
+
+    assert sqlite_client.patch(f"/resources/{created['id']}/adjust", json={"delta": -5}).status_code == 409
+    taken = sqlite_client.patch(f"/resources/{created['id']}/adjust", json={"delta": -3})
+    assert taken.json()["amount"] == 0
+    assert taken.headers["ETag"] == '"2"'
+    assert sqlite_client.patch("/resources/99/adjust", json={"delta": 1}).status_code == 404
+
+
+def test_concurrent_adjustments_lose_no_writes(file_client, file_sessions):
+    with file_sessions() as db:
+        db.add(models.Resource(item="Bread", amount=0))
+        db.commit()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = list(pool.map(lambda _: file_client.patch("/resources/1/adjust", json={"delta": 5}).status_code, range(40)))
+
+    assert statuses == [200] * 40
+    with file_sessions() as db:
+        resource = db.get(models.Resource, 1)
+        assert (resource.amount, resource.version) == (200, 41)
@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from ..models import models
+
+
+def seed_menu(db, bread=10, ham=5):
+    sandwich = models.Sandwich(sandwich_name="Ham", price=5)
+    bread_row = models.Resource(item="Bread", amount=bread)
+    ham_row = models.Resource(item="Ham", amount=ham)
+    db.add_all([
+        sandwich,
+        bread_row,
+        ham_row,
+        models.Recipe(sandwich=sandwich, resource=bread_row, amount=2),
+        models.Recipe(sandwich=sandwich, resource=ham_row, amount=1),
+    ])
+    db.commit()
+    return sandwich.id
+
+
+def stock(db):
+    db.expire_all()
+    return {r.item: r.amount for r in db.query(models.Resource)}
+
+
+def test_place_order_deducts_recipe_demand(sqlite_client, sqlite_db):
+    sandwich_id = seed_menu(sqlite_db)
+
+    response = sqlite_client.post("/orders/place", json={
+        "customer_name": "Jane",
+        "items": [{"sandwich_id": sandwich_id, "quantity": 2}, {"sandwich_id": sandwich_id, "quantity": 1}],
+    })
+
+    assert response.status_code == 200
+    assert response.json()["order_details"][0]["amount"] == 3
+    assert stock(sqlite_db) == {"Bread": 4, "Ham": 2}
+
+
+def test_place_order_rejects_insufficient_stock(sqlite_client, sqlite_db):
+    sandwich_id = seed_menu(sqlite_db, bread=10, ham=1)
+
+    response = sqlite_client.post("/orders/place", json={
+        "customer_name": "Jane",
+        "items": [{"sandwich_id": sandwich_id, "quantity": 2}],
+    })
+
+    assert response.status_code == 409
+    assert stock(sqlite_db) == {"Bread": 10, "Ham": 1}
+    assert sqlite_db.query(models.Order).count() == 0
+
+
+def test_place_order_unknown_sandwich(sqlite_client, sqlite_db):
+    seed_menu(sqlite_db)
+
+    response = sqlite_client.post("/orders/place", json={
+        "customer_name": "Jane",
+        "items": [{"sandwich_id": 999, "quantity": 1}],
+    })
+
+    assert response.status_code == 404
+
+
+def test_create_order_with_details(sqlite_client, sqlite_db):
+    sandwich_id = seed_menu(sqlite_db)
+
+    response = sqlite_client.post("/orders/", json={
+        "customer_name": "Jane",
+        "details": [{"sandwich_id": sandwich_id, "amount": 2}, {"sandwich_id": sandwich_id, "amount": 1}],
+    })
+
+    assert response.status_code == 200
+    lines = response.json()["order_details"]
+    assert [(line["amount"], line["sandwich"]["sandwich_name"]) for line in lines] == [(2, "Ham"), (1, "Ham")]
+    # Creating an order doesn't touch stock; that is what /orders/place is for
+    assert stock(sqlite_db) == {"Bread": 10, "Ham": 5}
+
+
+def test_create_order_with_unknown_sandwich_writes_nothing(sqlite_client, sqlite_db):
+    sandwich_id = seed_menu(sqlite_db)
+
+    response = sqlite_client.post("/orders/", json={
+        "customer_name": "Jane",
+        "details": [{"sandwich_id": sandwich_id, "amount": 1}, {"sandwich_id": 99, "amount": 1}],
+    })
+
+    assert response.status_code == 404
+    assert sqlite_db.query(models.Order).count() == 0
+
+
+def test_concurrent_placement_never_oversells(file_client, file_sessions):
+    db = file_sessions()
+    sandwich_id = seed_menu(db, bread=100, ham=40)
+    # Release the lock taken by reloading the sandwich id
+    db.close()
+
+    with file_client as client:
+        def place(_):
+            return client.post("/orders/place", json={
+                "customer_name": "Load",
+                "items": [{"sandwich_id": sandwich_id, "quantity": 1}],
+            }).status_code
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            codes = list(pool.map(place, range(200)))
+
+    # Bread allows 50 sandwiches, ham allows 40
+    assert codes.count(200) == 40
+    assert codes.count(409) == 160
+    assert stock(db) == {"Bread": 20, "Ham": 0}
+    assert db.query(models.OrderDetail).count() == 40
+    db.close()
@@ -0,0 +1,32 @@
+import json
+
+from ..models import models
+
+
+def seed_orders(db, count):
+    db.add_all([models.Order(customer_name=f"Customer {i}") for i in range(count)])
+    db.commit()
+
+
+def test_list_is_keyset_paginated(sqlite_client, sqlite_db):
+    seed_orders(sqlite_db, 5)
+
+    first = sqlite_client.get("/orders/", params={"limit": 2})
+    assert first.status_code == 200
+    assert [o["id"] for o in first.json()] == [1, 2]
+    assert first.headers["X-Next-After"] == "2"
+
+    rest = sqlite_client.get("/orders/", params={"limit": 2, "after": 4})
+    assert [o["id"] for o in rest.json()] == [5]
+    assert "X-Next-After" not in rest.headers
+
+
+def test_list_streams_ndjson(sqlite_client, sqlite_db):
+    seed_orders(sqlite_db, 3)
+
+    response = sqlite_client.get("/orders/", params={"stream": True, "after": 1})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["id"] for r in rows] == [2, 3]
+    assert rows[0]["customer_name"] == "Customer 1"
@@ -0,0 +1,50 @@
+import re
+
+from ..dependencies.config import conf
+from ..dependencies.profiling import metrics
+from ..models import models
+
+
+def timings(response):
+    return {
+        name: (float(dur), desc)
+        for name, dur, desc in re.findall(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response.headers["server-timing"])
+    }
+
+
+def test_profiling_is_opt_in(sqlite_client):
+    assert "server-timing" not in sqlite_client.get("/orders/").headers
+
+
+def test_server_timing_splits_request_phases(sqlite_client, sqlite_db, monkeypatch):
+    monkeypatch.setattr(conf, "profiling_enabled", True)
+    sqlite_db.add_all([models.Order(customer_name=f"Customer {i}") for i in range(3)])
+    sqlite_db.commit()
+
+    response = sqlite_client.get("/orders/")
+    phases = timings(response)
+    assert set(phases) == {"total", "db", "orm", "serialize"}
+    # The order list and its selectin load of details
+    assert phases["db"][1] == "statements: 2"
+    assert phases["db"][0] + phases["orm"][0] + phases["serialize"][0] <= phases["total"][0]
+
+
+def test_metrics_exposes_histograms_per_route(sqlite_client, monkeypatch):
+    monkeypatch.setattr(conf, "profiling_enabled", True)
+    metrics.reset()
+    sqlite_client.get("/sandwiches/1")
+    sqlite_client.get("/sandwiches/2")
+
+    body = sqlite_client.get("/metrics").text
+    labels = 'method="GET",route="/sandwiches/{sandwich_id}",phase="total"'
+    assert f'api_request_seconds_bucket{{{labels},le="+Inf"}} 2' in body
+    assert f"api_request_seconds_count{{{labels}}} 2" in body
+    assert 'api_db_statements_total{method="GET",route="/sandwiches/{sandwich_id}"} 2' in body
+
+
+def test_server_timing_on_async_session(async_client, monkeypatch):
+    monkeypatch.setattr(conf, "profiling_enabled", True)
+    async_client.post("/resources/", json={"item": "Bread", "amount": 10})
+
+    phases = timings(async_client.get("/resources/1"))
+    assert phases["db"][1] == "statements: 1"
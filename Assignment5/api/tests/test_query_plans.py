@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+
+from ..controllers import reports
+from ..models import models
+
+
+@pytest.fixture
+def seeded(sqlite_db):
+    sandwiches = [models.Sandwich(sandwich_name=f"Sandwich {i}", price=5) for i in range(10)]
+    resources = [models.Resource(item=f"Resource {i}", amount=100) for i in range(20)]
+    sqlite_db.add_all(sandwiches + resources)
+    sqlite_db.add_all(
+        models.Recipe(sandwich=sandwich, resource=resources[(i + j) % 20], amount=1)
+        for i, sandwich in enumerate(sandwiches) for j in range(3)
+    )
+    start = datetime(2024, 1, 1)
+    for i in range(500):
+        order = models.Order(customer_name=f"Customer {i % 50}", order_date=start + timedelta(hours=i))
+        sqlite_db.add(order)
+        sqlite_db.add_all(models.OrderDetail(order=order, sandwich=sandwiches[(i + j) % 10], amount=1) for j in range(2))
+    sqlite_db.commit()
+    sqlite_db.execute(text("ANALYZE"))
+
+
+def query_plan(db, statement):
+    sql = statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+# The access paths the API depends on; none of them may fall back to a full table scan
+QUERIES = {
+    "order details of orders": select(models.OrderDetail).where(models.OrderDetail.order_id.in_([1, 2, 3])),
+    "order details of sandwich": select(models.OrderDetail).where(models.OrderDetail.sandwich_id == 1),
+    "recipes of sandwich": select(models.Recipe).where(models.Recipe.sandwich_id == 1),
+    "recipes using resource": select(models.Recipe).where(models.Recipe.resource_id == 1),
+    "orders in date range": reports.in_range(select(models.Order), "2024-01-05 00:00:00", "2024-01-06 00:00:00"),
+    "orders of customer": select(models.Order).where(models.Order.customer_name == "Customer 7"),
+    "keyset page": select(models.Order).where(models.Order.id > 100).order_by(models.Order.id).limit(20),
+    "sales summary in range": reports.in_range(
+        reports.from_orders(models.Order.id, *reports.totals()), "2024-01-05 00:00:00", "2024-01-06 00:00:00"
+    ),
+}
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_query_uses_an_index(sqlite_db, seeded, name):
+    plan = query_plan(sqlite_db, QUERIES[name])
+
+    scans = [step for step in plan if step.startswith("SCAN")]
+    assert not scans, f"{name} scans a table: {plan}"
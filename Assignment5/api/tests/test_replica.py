@@ -0,0 +1,92 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from ..controllers import sandwiches
+from ..dependencies import database
+from ..dependencies.config import conf
+from ..main import app
+from ..models import models
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch):
+    """A primary and a replica that has fallen behind it: each holds a differently named resource."""
+    engines = {}
+    for name in ("primary", "replica"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db", connect_args={"check_same_thread": False})
+        models.Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            connection.execute(models.Resource.__table__.insert(), {"item": f"{name} bread", "amount": 1})
+        engines[name] = engine
+
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autoflush=False, bind=engines["primary"]))
+    monkeypatch.setattr(database, "ReplicaSessionLocal", sessionmaker(
+        autoflush=False, bind=engines["replica"], class_=database.ReplicaSession,
+    ))
+    yield engines
+    for engine in engines.values():
+        engine.dispose()
+
+
+def items(client):
+    return [r["item"] for r in client.get("/resources/").json()]
+
+
+def test_reads_go_to_the_replica_until_the_client_writes(databases):
+    with TestClient(app) as client:
+        assert items(client) == ["replica bread"]
+
+        written = client.post("/resources/", json={"item": "ham", "amount": 2})
+        assert database.PRIMARY_COOKIE in written.cookies
+        # Reads inside the window see the write
+        assert items(client) == ["primary bread", "ham"]
+
+    # Another client is unaffected
+    with TestClient(app) as other:
+        assert items(other) == ["replica bread"]
+
+
+def test_window_expires(databases, monkeypatch):
+    monkeypatch.setattr(conf, "read_your_writes_window", 0)
+    with TestClient(app) as client:
+        client.put("/resources/1", json={"amount": 5})
+        assert items(client) == ["replica bread"]
+
+
+def test_failed_writes_do_not_pin_reads(databases):
+    with TestClient(app) as client:
+        assert client.put("/resources/99", json={"amount": 5}).status_code == 404
+        assert items(client) == ["replica bread"]
+
+
+def test_replica_sessions_refuse_writes(databases):
+    db = database.ReplicaSessionLocal()
+    db.add(models.Resource(item="cheese", amount=1))
+    with pytest.raises(RuntimeError):
+        db.flush()
+    db.close()
+
+
+def test_replica_loads_are_not_cached_right_after_invalidation(databases):
+    replica = databases["replica"]
+    with replica.begin() as connection:
+        connection.execute(models.Sandwich.__table__.insert(), {"id": 1, "sandwich_name": "Club", "price": 5})
+
+    def rename_and_read(db, name):
+        with replica.begin() as connection:
+            connection.execute(models.Sandwich.__table__.update().values(sandwich_name=name))
+        return sandwiches.read_one(db, 1).sandwich_name
+
+    db = database.ReplicaSessionLocal()
+    # Just written on the primary: the replica may not have it yet, so what it returns isn't stored
+    sandwiches.invalidate()
+    assert sandwiches.read_one(db, 1).sandwich_name == "Club"
+    assert rename_and_read(db, "Club v2") == "Club v2"
+
+    # Long after the last write, replica reads are cached as usual
+    sandwiches.sandwich_cache.invalidated_at = float("-inf")
+    assert sandwiches.read_one(db, 1).sandwich_name == "Club v2"
+    assert rename_and_read(db, "Club v3") == "Club v2"
+    db.close()
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+from ..models import models
+
+
+@pytest.fixture
+def sales(sqlite_db):
+    ham = models.Sandwich(sandwich_name="Ham", price=5)
+    club = models.Sandwich(sandwich_name="Club", price=7.5)
+    orders = [
+        models.Order(customer_name="A", order_date=datetime(2024, 5, 1, 11, 15)),
+        models.Order(customer_name="B", order_date=datetime(2024, 5, 1, 11, 45)),
+        models.Order(customer_name="C", order_date=datetime(2024, 5, 2, 12, 5)),
+    ]
+    sqlite_db.add_all([
+        ham, club, *orders,
+        models.OrderDetail(order=orders[0], sandwich=ham, amount=2),
+        models.OrderDetail(order=orders[0], sandwich=club, amount=1),
+        models.OrderDetail(order=orders[1], sandwich=ham, amount=1),
+        models.OrderDetail(order=orders[2], sandwich=club, amount=4),
+    ])
+    sqlite_db.commit()
+
+
+def test_summary_respects_date_range(sqlite_client, sales):
+    assert sqlite_client.get("/reports/summary").json() == {"orders": 3, "units": 8, "revenue": 52.5}
+    may_first = sqlite_client.get("/reports/summary", params={"start": "2024-05-01T00:00:00", "end": "2024-05-02T00:00:00"})
+    assert may_first.json() == {"orders": 2, "units": 4, "revenue": 22.5}
+
+
+def test_sales_by_sandwich(sqlite_client, sales):
+    rows = sqlite_client.get("/reports/sandwiches").json()
+    assert [(r["sandwich_name"], r["orders"], r["units"], r["revenue"]) for r in rows] == [
+        ("Ham", 2, 3, 15.0),
+        ("Club", 2, 5, 37.5),
+    ]
+
+
+@pytest.mark.parametrize("bucket, expected", [
+    ("day", [("2024-05-01T00:00:00", 2, 4), ("2024-05-02T00:00:00", 1, 4)]),
+    ("hour", [("2024-05-01T11:00:00", 2, 4), ("2024-05-02T12:00:00", 1, 4)]),
+])
+def test_sales_by_period(sqlite_client, sales, bucket, expected):
+    rows = sqlite_client.get("/reports/periods", params={"bucket": bucket}).json()
+    assert [(r["period"], r["orders"], r["units"]) for r in rows] == expected
@@ -0,0 +1,54 @@
+import pytest
+
+from ..models import models
+
+
+@pytest.fixture
+def seeded(sqlite_db):
+    sandwich = models.Sandwich(sandwich_name="Ham", price=5)
+    other = models.Sandwich(sandwich_name="Club", price=6)
+    bread = models.Resource(item="Bread", amount=10)
+    ham = models.Resource(item="Ham", amount=10)
+    order = models.Order(customer_name="Jane")
+    sqlite_db.add_all([
+        sandwich, other, bread, ham, order,
+        models.Recipe(sandwich=sandwich, resource=bread, amount=2),
+        models.OrderDetail(order=order, sandwich=sandwich, amount=1),
+    ])
+    sqlite_db.commit()
+
+
+# (method, path, body, expected status, statements)
+WRITE_ROUTES = [
+    ("post", "/recipes/", {"sandwich_id": 1, "resource_id": 2, "amount": 1}, 200, 3),
+    ("post", "/recipes/", {"sandwich_id": 1, "resource_id": 99, "amount": 1}, 404, 1),
+    ("put", "/recipes/1", {"sandwich_id": 2, "amount": 3}, 200, 3),
+    ("put", "/recipes/1", {"amount": 3}, 200, 2),
+    ("put", "/recipes/99", {"amount": 3}, 404, 1),
+    ("delete", "/recipes/1", None, 204, 1),
+    ("delete", "/recipes/99", None, 404, 1),
+    ("post", "/order_details/", {"order_id": 1, "sandwich_id": 2, "amount": 1}, 200, 3),
+    ("post", "/order_details/", {"order_id": 99, "sandwich_id": 2, "amount": 1}, 404, 1),
+    ("put", "/order_details/1", {"sandwich_id": 2}, 200, 3),
+    ("put", "/order_details/99", {"amount": 4}, 404, 1),
+    ("delete", "/order_details/1", None, 204, 1),
+    ("post", "/orders/", {"customer_name": "John", "details": [
+        {"sandwich_id": 1, "amount": 2}, {"sandwich_id": 2, "amount": 1}, {"sandwich_id": 1, "amount": 1},
+    ]}, 200, 5),
+    ("post", "/orders/", {"customer_name": "John", "details": [{"sandwich_id": 99, "amount": 1}]}, 404, 1),
+    ("put", "/orders/1", {"description": "Toasted"}, 200, 3),
+    ("delete", "/orders/99", None, 404, 1),
+    ("put", "/sandwiches/1", {"price": 7}, 200, 2),
+    ("delete", "/sandwiches/99", None, 404, 1),
+    ("put", "/resources/1", {"amount": 7}, 200, 2),
+    ("delete", "/resources/99", None, 404, 1),
+]
+
+
+@pytest.mark.parametrize("method, path, body, expected_status, expected_statements", WRITE_ROUTES)
+def test_write_route_statement_count(sqlite_client, seeded, statements, method, path, body, expected_status, expected_statements):
+    statements.clear()
+    response = sqlite_client.request(method.upper(), path, json=body)
+
+    assert response.status_code == expected_status
+    assert len(statements) == expected_statements, statements
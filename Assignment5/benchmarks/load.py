@@ -0,0 +1,398 @@
+"""Seed a database and drive every API route concurrently, reporting latency and throughput per endpoint.
+
+Run from Assignment5/:
+
+    python -m benchmarks.load --url sqlite:///./bench.db --output results.json
+    python -m benchmarks.load --url "mysql+pymysql://root:pw@127.0.0.1:3306/bench" --order-details 2000000
+    python -m benchmarks.load --url sqlite:///./bench.db --compare results.json
+
+Without --url the app's own configured database and DB_MODE are used. Seeding is skipped when the
+database already holds the requested volumes, so repeated runs against one database are comparable.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import subprocess
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from api import migrate
+from api.dependencies import database
+from api.dependencies.ingest import order_ingest
+from api.main import app
+from api.models import models
+from .pool_benchmark import percentile
+
+SEED_CHUNK = 10000
+# Routes that are not request/response and can't be timed like the rest
+SKIPPED = {("GET", "/resources/events")}
+
+
+def insert_rows(connection, model, rows):
+    """Insert rows in chunks and return their new ids, in order."""
+    start = connection.scalar(select(func.coalesce(func.max(model.id), 0)))
+    for offset in range(0, len(rows), SEED_CHUNK):
+        connection.execute(insert(model), rows[offset:offset + SEED_CHUNK])
+    return list(connection.scalars(select(model.id).where(model.id > start).order_by(model.id)))
+
+
+def seed(engine, args, rng):
+    """Top every table up to the requested volume; existing rows count towards it."""
+    counts = {}
+    with engine.begin() as connection:
+        for model in (models.Sandwich, models.Resource, models.Recipe, models.Order, models.OrderDetail):
+            counts[model] = connection.scalar(select(func.count()).select_from(model))
+
+        token = uuid.uuid4().hex[:8]
+        insert_rows(connection, models.Sandwich, [
+            {"sandwich_name": f"Sandwich {token} {i}", "price": round(rng.uniform(3, 15), 2)}
+            for i in range(max(args.sandwiches - counts[models.Sandwich], 0))
+        ])
+        # Stock is effectively unlimited so order placement never runs out mid-run
+        insert_rows(connection, models.Resource, [
+            {"item": f"Resource {token} {i}", "amount": 10 ** 9, "low_stock_threshold": 100}
+            for i in range(max(args.resources - counts[models.Resource], 0))
+        ])
+        sandwich_ids = list(connection.scalars(select(models.Sandwich.id).order_by(models.Sandwich.id).limit(args.sandwiches)))
+        resource_ids = list(connection.scalars(select(models.Resource.id).order_by(models.Resource.id).limit(args.resources)))
+
+        if counts[models.Recipe] == 0:
+            per_sandwich = min(args.recipes_per_sandwich, len(resource_ids))
+            insert_rows(connection, models.Recipe, [
+                {"sandwich_id": sandwich_id, "resource_id": resource_id, "amount": rng.randint(1, 3)}
+                for sandwich_id in sandwich_ids
+                for resource_id in rng.sample(resource_ids, per_sandwich)
+            ])
+
+        now = datetime.now()
+        insert_rows(connection, models.Order, [
+            {"customer_name": f"Customer {rng.randrange(args.orders // 5 + 1)}",
+             "order_date": now - timedelta(minutes=rng.randrange(90 * 24 * 60))}
+            for _ in range(max(args.orders - counts[models.Order], 0))
+        ])
+        order_ids = list(connection.scalars(select(models.Order.id).order_by(models.Order.id).limit(args.orders)))
+
+        remaining = max(args.order_details - counts[models.OrderDetail], 0)
+        while remaining:
+            batch = min(remaining, SEED_CHUNK)
+            connection.execute(insert(models.OrderDetail), [
+                {"order_id": rng.choice(order_ids), "sandwich_id": rng.choice(sandwich_ids), "amount": rng.randint(1, 4)}
+                for _ in range(batch)
+            ])
+            remaining -= batch
+    return sandwich_ids, resource_ids, order_ids
+
+
+class Context:
+    """Ids the scenarios read and write, plus pools of rows that exist only to be deleted."""
+
+    def __init__(self, engine, args, rng, sandwich_ids, resource_ids, order_ids):
+        self.rng = rng
+        self.token = uuid.uuid4().hex[:8]
+        self.counter = itertools.count()
+        self.sandwich_ids = sandwich_ids
+        self.resource_ids = resource_ids
+        self.order_ids = order_ids
+        self.bulk_size = args.bulk_size
+        with engine.begin() as connection:
+            self.recipe_ids = list(connection.scalars(select(models.Recipe.id).limit(10000)))
+            self.order_detail_ids = list(connection.scalars(select(models.OrderDetail.id).limit(10000)))
+
+            # Single deletes and bulk deletes each need their own supply of rows
+            needed = args.requests * (1 + args.bulk_size)
+            self.pools = {
+                "orders": insert_rows(connection, models.Order, [
+                    {"customer_name": f"Disposable {self.token}"} for _ in range(needed)
+                ]),
+                "sandwiches": insert_rows(connection, models.Sandwich, [
+                    {"sandwich_name": f"Disposable {self.token} {i}", "price": 1} for i in range(needed)
+                ]),
+                "resources": insert_rows(connection, models.Resource, [
+                    {"item": f"Disposable {self.token} {i}", "amount": 1} for i in range(needed)
+                ]),
+                "order_details": insert_rows(connection, models.OrderDetail, [
+                    {"order_id": order_ids[0], "sandwich_id": sandwich_ids[0], "amount": 1} for _ in range(needed)
+                ]),
+            }
+            # Recipes are unique per (sandwich, resource): new and disposable ones each get a fresh sandwich
+            hosts = insert_rows(connection, models.Sandwich, [
+                {"sandwich_name": f"Recipe host {self.token} {i}", "price": 1} for i in range(2 * needed)
+            ])
+            self.pools["recipes"] = insert_rows(connection, models.Recipe, [
+                {"sandwich_id": sandwich_id, "resource_id": resource_ids[0], "amount": 1} for sandwich_id in hosts[:needed]
+            ])
+            self.pools["recipe_hosts"] = hosts[needed:]
+        self.pools = {name: iter(ids) for name, ids in self.pools.items()}
+
+    def take(self, pool, count=None):
+        if count is None:
+            return next(self.pools[pool])
+        return list(itertools.islice(self.pools[pool], count))
+
+    def unique(self, prefix):
+        return f"{prefix} {self.token} {next(self.counter)}"
+
+    def pick(self, ids, count=None):
+        return self.rng.choice(ids) if count is None else self.rng.sample(ids, min(count, len(ids)))
+
+
+def bulk(ctx, make):
+    return [make() for _ in range(ctx.bulk_size)]
+
+
+# (method, route, build) where build(ctx) returns the concrete path and JSON body of one request
+SCENARIOS = [
+    ("GET", "/orders/", lambda ctx: ("/orders/?limit=100", None)),
+    ("GET", "/orders/{order_id}", lambda ctx: (f"/orders/{ctx.pick(ctx.order_ids)}", None)),
+    ("POST", "/orders/", lambda ctx: ("/orders/", {"customer_name": ctx.unique("Customer"), "description": "bench"})),
+    ("POST", "/orders/place", lambda ctx: ("/orders/place", {
+        "customer_name": ctx.unique("Customer"),
+        "items": [{"sandwich_id": ctx.pick(ctx.sandwich_ids), "quantity": 1}],
+    })),
+    ("PUT", "/orders/{order_id}", lambda ctx: (f"/orders/{ctx.pick(ctx.order_ids)}", {"description": ctx.unique("Note")})),
+    ("POST", "/orders/ingest", lambda ctx: ("/orders/ingest", {"customer_name": ctx.unique("Customer"), "description": "bench"})),
+    ("GET", "/orders/ingest/{order_id}", lambda ctx: (f"/orders/ingest/{ctx.pick(ctx.order_ids)}", None)),
+    ("POST", "/orders/bulk", lambda ctx: ("/orders/bulk", bulk(ctx, lambda: {"customer_name": ctx.unique("Customer")}))),
+    ("PATCH", "/orders/bulk", lambda ctx: ("/orders/bulk", [
+        {"id": order_id, "description": "bulk"} for order_id in ctx.pick(ctx.order_ids, ctx.bulk_size)
+    ])),
+    ("DELETE", "/orders/{order_id}", lambda ctx: (f"/orders/{ctx.take('orders')}", None)),
+    ("DELETE", "/orders/bulk", lambda ctx: ("/orders/bulk", ctx.take("orders", ctx.bulk_size))),
+
+    ("GET", "/sandwiches/", lambda ctx: ("/sandwiches/?limit=100", None)),
+    ("GET", "/sandwiches/availability", lambda ctx: ("/sandwiches/availability", None)),
+    ("GET", "/sandwiches/{sandwich_id}", lambda ctx: (f"/sandwiches/{ctx.pick(ctx.sandwich_ids)}", None)),
+    ("POST", "/sandwiches/", lambda ctx: ("/sandwiches/", {"sandwich_name": ctx.unique("Sandwich"), "price": 5})),
+    ("PUT", "/sandwiches/{sandwich_id}", lambda ctx: (f"/sandwiches/{ctx.pick(ctx.sandwich_ids)}", {"price": 6})),
+    ("POST", "/sandwiches/bulk", lambda ctx: ("/sandwiches/bulk", bulk(ctx, lambda: {"sandwich_name": ctx.unique("Sandwich"), "price": 5}))),
+    ("PATCH", "/sandwiches/bulk", lambda ctx: ("/sandwiches/bulk", [
+        {"id": sandwich_id, "price": 7} for sandwich_id in ctx.pick(ctx.sandwich_ids, ctx.bulk_size)
+    ])),
+    ("DELETE", "/sandwiches/{sandwich_id}", lambda ctx: (f"/sandwiches/{ctx.take('sandwiches')}", None)),
+    ("DELETE", "/sandwiches/bulk", lambda ctx: ("/sandwiches/bulk", ctx.take("sandwiches", ctx.bulk_size))),
+
+    ("GET", "/resources/", lambda ctx: ("/resources/?limit=100", None)),
+    ("GET", "/resources/{resource_id}", lambda ctx: (f"/resources/{ctx.pick(ctx.resource_ids)}", None)),
+    ("POST", "/resources/", lambda ctx: ("/resources/", {"item": ctx.unique("Resource"), "amount": 100})),
+    ("PUT", "/resources/{resource_id}", lambda ctx: (f"/resources/{ctx.pick(ctx.resource_ids)}", {"low_stock_threshold": 50})),
+    ("PATCH", "/resources/{resource_id}/adjust", lambda ctx: (f"/resources/{ctx.pick(ctx.resource_ids)}/adjust", {"delta": 10})),
+    ("POST", "/resources/bulk", lambda ctx: ("/resources/bulk", bulk(ctx, lambda: {"item": ctx.unique("Resource"), "amount": 100}))),
+    ("PATCH", "/resources/bulk", lambda ctx: ("/resources/bulk", [
+        {"id": resource_id, "low_stock_threshold": 100} for resource_id in ctx.pick(ctx.resource_ids, ctx.bulk_size)
+    ])),
+    ("DELETE", "/resources/{resource_id}", lambda ctx: (f"/resources/{ctx.take('resources')}", None)),
+    ("DELETE", "/resources/bulk", lambda ctx: ("/resources/bulk", ctx.take("resources", ctx.bulk_size))),
+
+    ("GET", "/recipes/", lambda ctx: ("/recipes/?limit=100", None)),
+    ("GET", "/recipes/{recipe_id}", lambda ctx: (f"/recipes/{ctx.pick(ctx.recipe_ids)}", None)),
+    ("POST", "/recipes/", lambda ctx: ("/recipes/", {
+        "sandwich_id": ctx.take("recipe_hosts"), "resource_id": ctx.pick(ctx.resource_ids), "amount": 1,
+    })),
+    ("PUT", "/recipes/{recipe_id}", lambda ctx: (f"/recipes/{ctx.pick(ctx.recipe_ids)}", {"amount": 2})),
+    ("POST", "/recipes/bulk", lambda ctx: ("/recipes/bulk", [
+        {"sandwich_id": sandwich_id, "resource_id": ctx.pick(ctx.resource_ids), "amount": 1}
+        for sandwich_id in ctx.take("recipe_hosts", ctx.bulk_size)
+    ])),
+    ("PATCH", "/recipes/bulk", lambda ctx: ("/recipes/bulk", [
+        {"id": recipe_id, "amount": 2} for recipe_id in ctx.pick(ctx.recipe_ids, ctx.bulk_size)
+    ])),
+    ("DELETE", "/recipes/{recipe_id}", lambda ctx: (f"/recipes/{ctx.take('recipes')}", None)),
+    ("DELETE", "/recipes/bulk", lambda ctx: ("/recipes/bulk", ctx.take("recipes", ctx.bulk_size))),
+
+    ("GET", "/order_details/", lambda ctx: ("/order_details/?limit=100", None)),
+    ("GET", "/order_details/{order_detail_id}", lambda ctx: (f"/order_details/{ctx.pick(ctx.order_detail_ids)}", None)),
+    ("POST", "/order_details/", lambda ctx: ("/order_details/", {
+        "order_id": ctx.pick(ctx.order_ids), "sandwich_id": ctx.pick(ctx.sandwich_ids), "amount": 1,
+    })),
+    ("PUT", "/order_details/{order_detail_id}", lambda ctx: (f"/order_details/{ctx.pick(ctx.order_detail_ids)}", {"amount": 2})),
+    ("POST", "/order_details/bulk", lambda ctx: ("/order_details/bulk", bulk(ctx, lambda: {
+        "order_id": ctx.pick(ctx.order_ids), "sandwich_id": ctx.pick(ctx.sandwich_ids), "amount": 1,
+    }))),
+    ("PATCH", "/order_details/bulk", lambda ctx: ("/order_details/bulk", [
+        {"id": order_detail_id, "amount": 3} for order_detail_id in ctx.pick(ctx.order_detail_ids, ctx.bulk_size)
+    ])),
+    ("DELETE", "/order_details/{order_detail_id}", lambda ctx: (f"/order_details/{ctx.take('order_details')}", None)),
+    ("DELETE", "/order_details/bulk", lambda ctx: ("/order_details/bulk", ctx.take("order_details", ctx.bulk_size))),
+
+    ("GET", "/reports/summary", lambda ctx: ("/reports/summary", None)),
+    ("GET", "/reports/sandwiches", lambda ctx: ("/reports/sandwiches", None)),
+    ("GET", "/reports/periods", lambda ctx: ("/reports/periods?bucket=day", None)),
+    ("GET", "/internal/pool", lambda ctx: ("/internal/pool", None)),
+    ("GET", "/internal/cache", lambda ctx: ("/internal/cache", None)),
+    ("GET", "/metrics", lambda ctx: ("/metrics", None)),
+]
+
+
+def api_routes():
+    """Every (method, path) the app serves, apart from the interactive docs."""
+    return {
+        (method, route.path)
+        for route in app.routes
+        if getattr(route, "include_in_schema", False)
+        for method in route.methods - {"HEAD"}
+    }
+
+
+def uncovered_routes():
+    return api_routes() - {(method, route) for method, route, _ in SCENARIOS} - SKIPPED
+
+
+async def drive(client, ctx, build, method, requests, concurrency):
+    # Build every request up front so id and name generation stays out of the timings
+    calls = [build(ctx) for _ in range(requests)]
+    latencies = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(path, body):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(path, body) for path, body in calls))
+    elapsed = time.perf_counter() - start
+    errors = sum(count for code, count in statuses.items() if code >= 400)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "req_per_s": round(requests / elapsed, 1),
+    }
+
+
+async def run_scenarios(engine, ctx, args):
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport doesn't run the lifespan, so start the ingest queue against the benchmark database here
+    order_ingest.start(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for method, route, build in SCENARIOS:
+                if args.only and not any(pattern in route for pattern in args.only):
+                    continue
+                results[f"{method} {route}"] = await drive(client, ctx, build, method, args.requests, args.concurrency)
+    finally:
+        await order_ingest.stop()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    print(f"\n{'endpoint':<40} {'p95 before':>11} {'p95 after':>10} {'change':>8}")
+    for name, result in results["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            continue
+        change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0
+        print(f"{name:<40} {before['p95_ms']:>9.2f}ms {result['p95_ms']:>8.2f}ms {change:>+7.1f}%")
+
+
+def run(args):
+    """Seed, drive every scenario, and return the results document."""
+    rng = random.Random(args.seed)
+    if args.url:
+        engine = database.build_engine(args.url)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[database.get_db] = override_get_db
+    else:
+        engine = database.engine
+
+    try:
+        migrate.upgrade(engine)
+        ids = seed(engine, args, rng)
+        ctx = Context(engine, args, rng, *ids)
+        endpoints = asyncio.run(run_scenarios(engine, ctx, args))
+    finally:
+        app.dependency_overrides.pop(database.get_db, None)
+        if args.url:
+            engine.dispose()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "dialect": engine.dialect.name,
+            "volumes": {
+                "sandwiches": args.sandwiches, "resources": args.resources,
+                "recipes_per_sandwich": args.recipes_per_sandwich,
+                "orders": args.orders, "order_details": args.order_details,
+            },
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "bulk_size": args.bulk_size,
+            "seed": args.seed,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="database to seed and benchmark; defaults to the app's configured one")
+    parser.add_argument("--sandwiches", type=int, default=50)
+    parser.add_argument("--resources", type=int, default=200)
+    parser.add_argument("--recipes-per-sandwich", type=int, default=5)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--order-details", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--bulk-size", type=int, default=10, help="items per bulk request")
+    parser.add_argument("--seed", type=int, default=3155)
+    parser.add_argument("--only", nargs="+", help="only routes containing one of these strings")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="print p95 changes against an earlier results file")
+    return parser
+
+
+def main():
+    args = parser().parse_args()
+    missing = uncovered_routes()
+    if missing:
+        print("No scenario for:", ", ".join(f"{method} {route}" for method, route in sorted(missing)))
+
+    results = run(args)
+    print(f"{'endpoint':<40} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for name, result in results["endpoints"].items():
+        print(
+            f"{name:<40} {result['req_per_s']:>8.1f} {result['p50_ms']:>7.2f}ms "
+            f"{result['p95_ms']:>7.2f}ms {result['p99_ms']:>7.2f}ms {result['errors']:>7}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare request latency under different connection pool sizes.
+
+Run from Assignment5/:
+
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.pool_benchmark
+    DATABASE_URL="mysql+pymysql://root:pw@127.0.0.1:3306/sandwich_maker_api" python -m benchmarks.pool_benchmark --sizes 2 5 10 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy.orm import sessionmaker
+
+from api.dependencies.database import SQLALCHEMY_DATABASE_URL, build_engine, get_db, pool_status
+from api.main import app
+from api.models import models
+
+
+def seed(engine, orders=500):
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        if db.query(models.Order).count() >= orders:
+            return
+        db.add_all([models.Order(customer_name=f"Customer {i}") for i in range(orders)])
+        db.commit()
+
+
+async def drive(path, requests, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def percentile(values, pct):
+    return statistics.quantiles(values, n=100)[pct - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 5, 10])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--path", default="/orders/?limit=50")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        engine = build_engine(SQLALCHEMY_DATABASE_URL, pool_size=size, max_overflow=0)
+        models.Base.metadata.create_all(bind=engine)
+        seed(engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        latencies, elapsed = asyncio.run(drive(args.path, args.requests, args.concurrency))
+        status = pool_status(engine)
+        print(
+            f"pool_size={size:<3} req/s={args.requests / elapsed:8.1f} "
+            f"p50={percentile(latencies, 50):7.2f}ms p99={percentile(latencies, 99):7.2f}ms "
+            f"wait_avg={status.get('wait_avg_ms', 0):.2f}ms wait_max={status.get('wait_max_ms', 0):.2f}ms"
+        )
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
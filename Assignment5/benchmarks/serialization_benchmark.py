@@ -0,0 +1,88 @@
+"""Compare the ORM + response_model read path with the plain-row orjson path on large order listings.
+
+Run from Assignment5/:
+
+    python -m benchmarks.serialization_benchmark
+    python -m benchmarks.serialization_benchmark --orders 5000 --details 4 --limit 1000 --repeat 20
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import orjson
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from api import migrate
+from api.controllers import orders
+from api.dependencies.http_cache import adapter
+from api.models import models, schemas
+
+
+def seed(engine, order_count, details_per_order):
+    with engine.begin() as connection:
+        connection.execute(insert(models.Sandwich), [
+            {"id": i, "sandwich_name": f"Sandwich {i}", "price": 5 + i % 7 + 0.25} for i in range(1, 21)
+        ])
+        connection.execute(insert(models.Order), [
+            {"id": i, "customer_name": f"Customer {i % 500}", "description": "Extra pickles"} for i in range(1, order_count + 1)
+        ])
+        connection.execute(insert(models.OrderDetail), [
+            {"order_id": order_id, "sandwich_id": (order_id + n) % 20 + 1, "amount": n + 1}
+            for order_id in range(1, order_count + 1)
+            for n in range(details_per_order)
+        ])
+
+
+def orm_path(db, params):
+    return adapter(list[schemas.Order]).dump_json(
+        adapter(list[schemas.Order]).validate_python(orders.read_all(db, params), from_attributes=True)
+    )
+
+
+def plain_path(db, params):
+    return orjson.dumps(orders.read_all_plain(db, params))
+
+
+def timed(fn, Session, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        # A fresh session each time so the ORM path can't reuse objects from the identity map
+        with Session() as db:
+            start = time.perf_counter()
+            body = fn(db, params)
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--details", type=int, default=3, help="details per order")
+    parser.add_argument("--limit", type=int, default=1000, help="orders per page")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{Path(directory) / 'serialization.db'}")
+        migrate.upgrade(engine)
+        seed(engine, args.orders, args.details)
+        Session = sessionmaker(bind=engine)
+        # The attributes of ListParams the controllers read, for one plain page
+        params = SimpleNamespace(limit=args.limit, after=None, cursor=None, stream=False, sort=(), fields=(), filters=())
+
+        orm_ms, orm_body = timed(orm_path, Session, params, args.repeat)
+        plain_ms, plain_body = timed(plain_path, Session, params, args.repeat)
+        assert orm_body == plain_body, "fast path output differs from response_model output"
+        engine.dispose()
+
+    print(f"{args.limit} orders x {args.details} details, {len(orm_body) / 1024:.0f} KiB per page")
+    print(f"ORM + response_model: {orm_ms:8.2f}ms")
+    print(f"plain rows + orjson:  {plain_ms:8.2f}ms  ({orm_ms / plain_ms:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Compare throughput of `python -m api.serve` with one worker against several.
+
+Run from Assignment5/:
+
+    python -m benchmarks.workers_benchmark
+    python -m benchmarks.workers_benchmark --workers 1 2 4 --duration 15 --concurrency 128
+
+Each run starts the real server on a seeded SQLite file, drives a mix of read routes
+over HTTP for --duration seconds, then stops it with SIGTERM. The load generator is
+a single asyncio process; if its CPU is saturated, the numbers measure the client, so
+keep an eye on it with more workers than cores.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+
+from api import migrate
+from .pool_benchmark import percentile
+from .serialization_benchmark import seed
+
+ROOT = Path(__file__).resolve().parent.parent
+PATHS = ["/sandwiches/", "/sandwiches/availability", "/recipes/", "/orders/?limit=20", "/resources/"]
+
+
+async def wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/sandwiches/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not come up")
+
+
+async def drive(base_url, duration, concurrency):
+    latencies = []
+    errors = 0
+    paths = itertools.cycle(PATHS)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.monotonic() + duration
+
+        async def user():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                response = await client.get(next(paths))
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code >= 400
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def measure(workers, port, database_url, args):
+    env = {**os.environ, "DATABASE_URL": database_url}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "api.serve", "--workers", str(workers), "--port", str(port), "--host", "127.0.0.1"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_until_up(base_url))
+        return asyncio.run(drive(base_url, args.duration, args.concurrency))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{Path(directory) / 'workers.db'}"
+        engine = create_engine(database_url)
+        migrate.upgrade(engine)
+        seed(engine, args.orders, 3)
+        engine.dispose()
+
+        results = {workers: measure(workers, args.port + i, database_url, args) for i, workers in enumerate(args.workers)}
+
+    baseline = results[args.workers[0]]["req_per_s"]
+    print(f"{'workers':>7} {'req/s':>9} {'p50':>9} {'p99':>9} {'errors':>7} {'speedup':>8}")
+    for workers, result in results.items():
+        print(
+            f"{workers:>7} {result['req_per_s']:>9.1f} {result['p50_ms']:>7.2f}ms {result['p99_ms']:>7.2f}ms"
+            f" {result['errors']:>7} {result['req_per_s'] / baseline:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
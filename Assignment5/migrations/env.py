@@ -0,0 +1,41 @@
+from alembic import context
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from api.dependencies.database import SQLALCHEMY_DATABASE_URL
+from api.models import models
+
+target_metadata = models.Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(url=SQLALCHEMY_DATABASE_URL, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = context.config.attributes.get("connection")
+    if connection is None:
+        engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+        with engine.connect() as connection:
+            configure_and_run(connection)
+    else:
+        configure_and_run(connection)
+
+
+def configure_and_run(connection):
+    # SQLite can't ALTER most things in place; batch mode rebuilds the table instead
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,70 @@
+"""Initial schema, as previously created by metadata.create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "sandwiches",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("sandwich_name", sa.String(100), nullable=False, unique=True),
+        sa.Column("price", sa.DECIMAL(4, 2), nullable=False, server_default="0.00"),
+    )
+    op.create_index("ix_sandwiches_id", "sandwiches", ["id"])
+
+    op.create_table(
+        "resources",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("item", sa.String(100), nullable=False, unique=True),
+        sa.Column("amount", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_resources_id", "resources", ["id"])
+    op.create_index("ix_resources_amount", "resources", ["amount"])
+
+    op.create_table(
+        "recipes",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("sandwich_id", sa.Integer(), sa.ForeignKey("sandwiches.id"), nullable=False),
+        sa.Column("resource_id", sa.Integer(), sa.ForeignKey("resources.id"), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False, server_default="0"),
+        sa.UniqueConstraint("sandwich_id", "resource_id", name="uq_recipe_sandwich_resource"),
+    )
+    op.create_index("ix_recipes_id", "recipes", ["id"])
+    op.create_index("ix_recipes_amount", "recipes", ["amount"])
+
+    op.create_table(
+        "orders",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("customer_name", sa.String(100)),
+        sa.Column("order_date", sa.DATETIME(), nullable=False, server_default=sa.func.now()),
+        sa.Column("description", sa.String(300)),
+    )
+    op.create_index("ix_orders_id", "orders", ["id"])
+
+    op.create_table(
+        "order_details",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("order_id", sa.Integer(), sa.ForeignKey("orders.id"), nullable=False),
+        sa.Column("sandwich_id", sa.Integer(), sa.ForeignKey("sandwiches.id"), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_order_details_id", "order_details", ["id"])
+    op.create_index("ix_order_details_amount", "order_details", ["amount"])
+
+
+def downgrade():
+    op.drop_table("order_details")
+    op.drop_table("orders")
+    op.drop_table("recipes")
+    op.drop_table("resources")
+    op.drop_table("sandwiches")
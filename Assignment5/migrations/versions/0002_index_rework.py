@@ -0,0 +1,46 @@
+"""Index the real access paths and drop redundant indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# Primary keys are already indexed; the amount columns are rewritten far more often than searched
+DROPPED = [
+    ("ix_sandwiches_id", "sandwiches", ["id"]),
+    ("ix_resources_id", "resources", ["id"]),
+    ("ix_resources_amount", "resources", ["amount"]),
+    ("ix_recipes_id", "recipes", ["id"]),
+    ("ix_recipes_amount", "recipes", ["amount"]),
+    ("ix_orders_id", "orders", ["id"]),
+    ("ix_order_details_id", "order_details", ["id"]),
+    ("ix_order_details_amount", "order_details", ["amount"]),
+]
+
+CREATED = [
+    ("ix_recipes_resource_id", "recipes", ["resource_id"]),
+    ("ix_orders_order_date", "orders", ["order_date"]),
+    ("ix_orders_customer_name_order_date", "orders", ["customer_name", "order_date"]),
+    ("ix_order_details_order_sandwich_amount", "order_details", ["order_id", "sandwich_id", "amount"]),
+    ("ix_order_details_sandwich_id", "order_details", ["sandwich_id"]),
+]
+
+
+def upgrade():
+    for name, table, columns in CREATED:
+        op.create_index(name, table, columns)
+    for name, table, columns in DROPPED:
+        op.drop_index(name, table_name=table)
+
+
+def downgrade():
+    for name, table, columns in DROPPED:
+        op.create_index(name, table, columns)
+    for name, table, columns in CREATED:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,22 @@
+"""Store a low-stock threshold per resource
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("resources", sa.Column("low_stock_threshold", sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("resources") as batch_op:
+        batch_op.drop_column("low_stock_threshold")
@@ -0,0 +1,29 @@
+"""Stop SQLite from reusing order ids
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+MySQL 8.0+ keeps its AUTO_INCREMENT counter across restarts, so it never hands out an
+id below one already used (older versions reset it to MAX(id)+1 and aren't supported
+for ingestion). SQLite only behaves that way for tables declared AUTOINCREMENT, which
+the ingestion queue's id reservation relies on.
+"""
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table("orders", recreate="always", table_kwargs={"sqlite_autoincrement": True}):
+            pass
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table("orders", recreate="always", table_kwargs={"sqlite_autoincrement": False}):
+            pass
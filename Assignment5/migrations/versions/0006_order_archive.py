@@ -0,0 +1,47 @@
+"""Archive tables for old orders and their daily rollup
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "archived_orders",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("customer_name", sa.String(100)),
+        sa.Column("order_date", sa.DATETIME(), nullable=False),
+        sa.Column("description", sa.String(300)),
+    )
+    op.create_index("ix_archived_orders_order_date", "archived_orders", ["order_date"])
+    op.create_table(
+        "archived_order_details",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("order_id", sa.Integer(), sa.ForeignKey("archived_orders.id"), nullable=False),
+        sa.Column("sandwich_id", sa.Integer(), sa.ForeignKey("sandwiches.id"), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_archived_order_details_order_id", "archived_order_details", ["order_id"])
+    op.create_table(
+        "order_rollups",
+        sa.Column("day", sa.DATETIME(), primary_key=True),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("units", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.DECIMAL(12, 2), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("order_rollups")
+    op.drop_index("ix_archived_order_details_order_id", table_name="archived_order_details")
+    op.drop_table("archived_order_details")
+    op.drop_index("ix_archived_orders_order_date", table_name="archived_orders")
+    op.drop_table("archived_orders")
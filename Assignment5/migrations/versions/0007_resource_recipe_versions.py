@@ -0,0 +1,25 @@
+"""Version resources and recipes for If-Match updates
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("resources", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column("recipes", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    with op.batch_alter_table("recipes") as batch_op:
+        batch_op.drop_column("version")
+    with op.batch_alter_table("resources") as batch_op:
+        batch_op.drop_column("version")
@@ -0,0 +1,77 @@
+"""Roll archived orders up by hour and by sandwich
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+Daily rollups lost the hourly periods and the per-sandwich report for archived orders.
+Both tables are rebuilt from the archive tables, priced at today's sandwich prices.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def truncate(column, unit):
+    # Stored the way SQLAlchemy binds datetimes, so range filters compare like for like on SQLite
+    if op.get_bind().dialect.name == "mysql":
+        return f"DATE_FORMAT({column}, '%Y-%m-%d {unit}:00:00')"
+    return f"STRFTIME('%Y-%m-%d {unit}:00:00.000000', {column})"
+
+
+def upgrade():
+    op.drop_table("order_rollups")
+    op.create_table(
+        "order_rollups",
+        sa.Column("hour", sa.DATETIME(), primary_key=True),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("units", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.DECIMAL(12, 2), nullable=False),
+    )
+    op.create_table(
+        "sandwich_rollups",
+        sa.Column("hour", sa.DATETIME(), primary_key=True),
+        sa.Column("sandwich_id", sa.Integer(), sa.ForeignKey("sandwiches.id"), primary_key=True),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("units", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.DECIMAL(12, 2), nullable=False),
+    )
+    hour = truncate("o.order_date", "%H")
+    op.execute(
+        "INSERT INTO order_rollups (hour, orders, units, revenue) "
+        f"SELECT {hour}, COUNT(DISTINCT o.id), COALESCE(SUM(d.amount), 0), COALESCE(SUM(d.amount * s.price), 0) "
+        "FROM archived_orders o "
+        "LEFT JOIN archived_order_details d ON d.order_id = o.id "
+        "LEFT JOIN sandwiches s ON s.id = d.sandwich_id "
+        f"GROUP BY {hour}"
+    )
+    op.execute(
+        "INSERT INTO sandwich_rollups (hour, sandwich_id, orders, units, revenue) "
+        f"SELECT {hour}, d.sandwich_id, COUNT(DISTINCT o.id), SUM(d.amount), SUM(d.amount * s.price) "
+        "FROM archived_order_details d "
+        "JOIN archived_orders o ON o.id = d.order_id "
+        "JOIN sandwiches s ON s.id = d.sandwich_id "
+        f"GROUP BY {hour}, d.sandwich_id"
+    )
+
+
+def downgrade():
+    op.drop_table("sandwich_rollups")
+    op.create_table(
+        "daily_rollups",
+        sa.Column("day", sa.DATETIME(), primary_key=True),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("units", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.DECIMAL(12, 2), nullable=False),
+    )
+    day = truncate("hour", "00")
+    op.execute(
+        "INSERT INTO daily_rollups (day, orders, units, revenue) "
+        f"SELECT {day}, SUM(orders), SUM(units), SUM(revenue) FROM order_rollups GROUP BY {day}"
+    )
+    op.drop_table("order_rollups")
+    op.rename_table("daily_rollups", "order_rollups")
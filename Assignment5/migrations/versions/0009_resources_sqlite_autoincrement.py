@@ -0,0 +1,28 @@
+"""Stop SQLite from reusing resource ids
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+
+GET /resources/ tags a page by its row ids and versions. A resource created after the
+newest one was deleted must not come back with that id at version 1, or a stale page
+would still match.
+"""
+from alembic import op
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table("resources", recreate="always", table_kwargs={"sqlite_autoincrement": True}):
+            pass
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table("resources", recreate="always", table_kwargs={"sqlite_autoincrement": False}):
+            pass